@@ -0,0 +1,151 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+
+import degrees
+from graph import load_graph
+from instrument import stats
+from landmarks import LandmarkIndex
+
+ENGINES = ("bfs", "bidirectional", "csr", "landmarks")
+
+# Source and target person_ids searched on the small dataset
+SMALL_PAIRS = [
+    ("102", "158"),
+    ("102", "398"),
+    ("102", "1697"),
+    ("129", "1597"),
+    ("158", "420"),
+    ("197", "596520"),
+    ("420", "1697"),
+    ("641", "914612"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the degrees search engines.")
+    parser.add_argument("directory", nargs="?", default="small",
+                        help="dataset to search (ignored with --synthetic)")
+    parser.add_argument("--synthetic", type=int, metavar="PEOPLE",
+                        help="generate a random dataset with this many people")
+    parser.add_argument("--movies", type=int,
+                        help="movies in the synthetic dataset "
+                             "(default: half the people)")
+    parser.add_argument("--cast", type=int, default=4,
+                        help="stars per synthetic movie")
+    parser.add_argument("--pairs", type=int, default=50,
+                        help="random pairs to search on a synthetic dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES,
+                        default=list(ENGINES))
+    args = parser.parse_args()
+
+    if args.synthetic is None:
+        run(args.directory, SMALL_PAIRS, args.engines)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        movies = args.movies or max(1, args.synthetic // 2)
+        print(f"Generating {args.synthetic} people, {movies} movies...",
+              file=sys.stderr)
+        generate_dataset(directory, args.synthetic, movies, args.cast,
+                         args.seed)
+        rng = random.Random(args.seed)
+        pairs = [(str(rng.randrange(args.synthetic)),
+                  str(rng.randrange(args.synthetic)))
+                 for _ in range(args.pairs)]
+        run(directory, pairs, args.engines)
+
+
+def generate_dataset(directory, people, movies, cast, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv for a random dataset to
+    directory. Stars are drawn with a skew towards low person_ids, so that
+    like real casts a few people appear in many movies.
+    """
+    rng = random.Random(seed)
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(people):
+            writer.writerow([person, f"Person {person}",
+                             rng.randrange(1920, 2005)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(movies):
+            writer.writerow([movie, f"Movie {movie}",
+                             rng.randrange(1930, 2020)])
+
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            for _ in range(cast):
+                person = min(int(rng.paretovariate(0.6)) - 1, people - 1)
+                if rng.random() < 0.7:
+                    person = rng.randrange(people)
+                writer.writerow([person, movie])
+
+
+def run(directory, pairs, engines):
+    """
+    Searches every pair with each engine over directory and prints one
+    line of timings and counters per engine.
+    """
+    print(f"{'engine':14} {'load s':>8} {'index s':>8} {'search s':>9} "
+          f"{'ms/query':>9} {'expanded':>10} {'peak':>8} {'neighbors':>11}")
+    lengths = {}
+    for engine in engines:
+        stats.reset()
+        index = None
+        with stats.phase("load"):
+            if engine in ("bfs", "bidirectional"):
+                degrees.load_data(directory, use_snapshot=False)
+            else:
+                degrees.use_graph(load_graph(directory))
+        if engine == "landmarks":
+            with stats.phase("index"):
+                index = LandmarkIndex.build(degrees.graph)
+
+        # Only count the work done answering the queries themselves
+        stats.reset_counters()
+        results = []
+        with stats.phase("search"):
+            for source, target in pairs:
+                if engine == "bfs":
+                    path = degrees.shortest_path(source, target)
+                elif engine == "bidirectional":
+                    path = degrees.shortest_path_bidirectional(source, target)
+                elif engine == "csr":
+                    path = degrees.graph.shortest_path(source, target)
+                else:
+                    path = index.shortest_path(source, target)
+                results.append(None if path is None else len(path))
+
+        timings = stats.timings
+        print(f"{engine:14} {timings['load']:8.3f} "
+              f"{timings.get('index', 0.0):8.3f} {timings['search']:9.3f} "
+              f"{1000 * timings['search'] / max(1, len(pairs)):9.3f} "
+              f"{stats.nodes_expanded:10} {stats.frontier_peak:8} "
+              f"{stats.neighbors_generated:11}")
+        lengths[engine] = results
+
+    # Every engine must agree on the degrees of separation
+    expected = next(iter(lengths.values()), None)
+    for engine, results in lengths.items():
+        if results != expected:
+            print(f"Warning: {engine} disagrees on path lengths",
+                  file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
+import argparse
 import csv
 import sys
 
+from graph import Graph, MoviesView, NamesView, PeopleView, load_graph
+from instrument import stats
+from landmarks import STRATEGIES, landmark_index
+from nameindex import NameIndex
+from snapshot import load_snapshot, write_snapshot
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,11 +18,28 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed copy of people and movies, when one is loaded
+graph = None
 
-def load_data(directory):
+# Prefix and fuzzy index over names, built on first use
+name_index = None
+
+
+def load_data(directory, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    If the directory holds an up to date snapshot (see snapshot.py),
+    it is mapped in instead of parsing the CSV files, unless use_snapshot
+    is False.
     """
+    if use_snapshot:
+        snapshot = load_snapshot(directory)
+        if snapshot is not None:
+            use_graph(snapshot)
+            return
+    _use_dictionaries()
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -52,24 +75,208 @@ def load_data(directory):
                 pass
 
 
+def load_filtered_data(directory, min_year=None, max_year=None,
+                       min_stars=None, person_ids=None):
+    """
+    Load only part of the data from CSV files into memory: movies released
+    between min_year and max_year (inclusive, either may be None), starring
+    at least min_stars (and at least one) of the kept people, and only the
+    people in person_ids (any iterable of person_ids, or None for
+    everyone) who star in a kept movie.
+
+    Rows are filtered as they are read, movies first, then stars, then
+    only the people starring in a kept movie, so memory scales with the
+    filtered data rather than the whole of it.
+    """
+    least_stars = max(min_stars or 0, 1)
+    _use_dictionaries()
+    people.clear()
+    movies.clear()
+    names.clear()
+    if person_ids is not None:
+        person_ids = set(person_ids)
+
+    # Load movies in the year range
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = _columns(next(reader))
+        for row in reader:
+            year = row[columns["year"]]
+            if min_year is not None or max_year is not None:
+                if not year.isdigit():
+                    continue
+                if ((min_year is not None and int(year) < min_year)
+                        or (max_year is not None and int(year) > max_year)):
+                    continue
+            movies[row[columns["id"]]] = {
+                "title": row[columns["title"]],
+                "year": year,
+                "stars": set()
+            }
+
+    # Load stars of kept movies
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = _columns(next(reader))
+        for row in reader:
+            person_id = row[columns["person_id"]]
+            movie = movies.get(row[columns["movie_id"]])
+            if movie is None:
+                continue
+            if person_ids is not None and person_id not in person_ids:
+                continue
+            movie["stars"].add(person_id)
+
+    # Drop movies with too few stars, then load the people starring
+    # in the ones left
+    starring = {}
+    for movie_id in list(movies):
+        stars = movies[movie_id]["stars"]
+        if len(stars) < least_stars:
+            del movies[movie_id]
+            continue
+        for person_id in stars:
+            starring.setdefault(person_id, set()).add(movie_id)
+
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = _columns(next(reader))
+        for row in reader:
+            person_id = row[columns["id"]]
+            if person_id not in starring:
+                continue
+            name = row[columns["name"]]
+            people[person_id] = {
+                "name": name,
+                "birth": row[columns["birth"]],
+                "movies": starring.pop(person_id)
+            }
+            names.setdefault(name.lower(), set()).add(person_id)
+
+    # Stars missing from people.csv can't be looked up, so drop them
+    short = set()
+    for person_id, movie_ids in starring.items():
+        for movie_id in movie_ids:
+            movies[movie_id]["stars"].discard(person_id)
+            if len(movies[movie_id]["stars"]) < least_stars:
+                short.add(movie_id)
+
+    # Then the movies that leaves with too few stars, and the people
+    # who starred in nothing else
+    for movie_id in short:
+        for person_id in movies.pop(movie_id)["stars"]:
+            person = people[person_id]
+            person["movies"].discard(movie_id)
+            if not person["movies"]:
+                del people[person_id]
+                lowered = person["name"].lower()
+                names[lowered].discard(person_id)
+                if not names[lowered]:
+                    del names[lowered]
+
+
+def _columns(header):
+    """Maps the column names of a CSV header row to their positions."""
+    return {name: i for i, name in enumerate(header)}
+
+
+def _use_dictionaries():
+    """
+    Switches people and movies back to plain dictionaries if a Graph was
+    in use, ready for loading from CSV files.
+    """
+    global graph, names, people, movies, name_index
+    name_index = None
+    if graph is not None:
+        graph = None
+        names = {}
+        people = {}
+        movies = {}
+
+
+def use_graph(loaded):
+    """
+    Makes a loaded Graph the source of people, movies and names,
+    in place of the dictionaries filled in by load_data.
+    """
+    global graph, names, people, movies, name_index
+    graph = loaded
+    name_index = None
+    names = NamesView(loaded)
+    people = PeopleView(loaded)
+    movies = MoviesView(loaded)
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two actors.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both source and target at once")
+    parser.add_argument("--csr", action="store_true",
+                        help="load into a compact integer-indexed graph")
+    parser.add_argument("--build-snapshot", action="store_true",
+                        help="(re)build the binary snapshot of the "
+                             "directory, then exit")
+    parser.add_argument("--landmarks", type=int, nargs="?", const=16,
+                        metavar="COUNT",
+                        help="estimate from (and build if needed) a landmark "
+                             "index, then search exactly with A*")
+    parser.add_argument("--landmark-strategy", choices=STRATEGIES,
+                        default="degree")
+    parser.add_argument("--min-year", type=int,
+                        help="only load movies released in or after this year")
+    parser.add_argument("--max-year", type=int,
+                        help="only load movies released in or before this year")
+    parser.add_argument("--min-stars", type=int,
+                        help="only load movies with at least this many stars")
+    parser.add_argument("--people", metavar="FILE",
+                        help="only load the person_ids listed in FILE, "
+                             "one per line")
+    parser.add_argument("--stats", action="store_true",
+                        help="print search counters and phase timings")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer source,target name pairs read from FILE "
+                             "(- for stdin), one pair per line")
+    args = parser.parse_args()
+
+    if args.build_snapshot:
+        print("Building snapshot...")
+        write_snapshot(load_graph(args.directory), args.directory)
+        print("Snapshot written.")
+        return
+
+    # Keep stdout for results alone in batch mode
+    log = sys.stderr if args.batch else sys.stdout
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=log)
+    with stats.phase("load"):
+        _load(args)
+    print("Data loaded.", file=log)
 
-    source = person_id_for_name(input("Name: "))
+    if args.batch:
+        with stats.phase("search"):
+            if args.batch == "-":
+                run_batch(sys.stdin, sys.stdout)
+            else:
+                with open(args.batch, encoding="utf-8") as f:
+                    run_batch(f, sys.stdout)
+        if args.stats:
+            print(stats.report(), file=log)
+        return
+
+    name = input("Name: ")
+    source = person_id_for_name(name)
     if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+        sys.exit(not_found_message(name))
+    name = input("Name: ")
+    target = person_id_for_name(name)
     if target is None:
-        sys.exit("Person not found.")
+        sys.exit(not_found_message(name))
 
-    path = shortest_path(source, target)
+    with stats.phase("search"):
+        path = _search(args, source, target)
 
     if path is None:
         print("Not connected.")
@@ -83,6 +290,51 @@ def main():
             movie = movies[path[i + 1][0]]["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
+    if args.stats:
+        print(stats.report())
+
+
+def _load(args):
+    """Loads the data main's command line arguments ask for."""
+    if (args.min_year is not None or args.max_year is not None
+          or args.min_stars is not None or args.people):
+        person_ids = None
+        if args.people:
+            with open(args.people, encoding="utf-8") as f:
+                person_ids = {line.strip() for line in f if line.strip()}
+        load_filtered_data(args.directory, args.min_year, args.max_year,
+                           args.min_stars, person_ids)
+        if args.csr or args.landmarks:
+            use_graph(Graph.from_data(people, movies))
+    elif args.csr or args.landmarks:
+        # Straight into a Graph, never holding the dictionaries as well
+        loaded = load_snapshot(args.directory)
+        use_graph(loaded if loaded is not None
+                  else load_graph(args.directory))
+    else:
+        load_data(args.directory)
+
+
+def _search(args, source, target):
+    """Runs the search main's command line arguments ask for."""
+    if args.landmarks:
+        with stats.phase("landmarks"):
+            index = landmark_index(graph, args.directory, args.landmarks,
+                                   args.landmark_strategy)
+        lower, upper = index.estimate(source, target)
+        if lower is None:
+            print("Estimate: not connected.")
+        elif upper is None:
+            print(f"Estimate: at least {lower} degrees of separation.")
+        else:
+            print(f"Estimate: {lower} to {upper} degrees of separation.")
+        return index.shortest_path(source, target)
+    if args.bidirectional:
+        return shortest_path_bidirectional(source, target)
+    if graph is not None:
+        return graph.shortest_path(source, target)
+    return shortest_path(source, target)
+
 
 def shortest_path(source, target):
     """
@@ -91,6 +343,8 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
+    stats.searches += 1
+
     # Initialization of data structs etc.
     # source is the id of the person, action corresponds to movie
     root = Node(state=source, parent=None, action=None)
@@ -102,10 +356,13 @@ def shortest_path(source, target):
         if frontier.empty():
             return None
 
+        stats.record(frontier=len(frontier.frontier))
         node = frontier.remove()
         explored.add(node.state)
 
-        for movie, actor in neighbors_for_person(node.state):
+        neighbors = neighbors_for_person(node.state)
+        stats.record(expanded=1, neighbors=len(neighbors))
+        for movie, actor in neighbors:
             if not frontier.contains_state(actor) and actor not in explored:
                 if actor == target:
                     pair_list = []
@@ -116,7 +373,218 @@ def shortest_path(source, target):
                     pair_list.reverse()
                     return pair_list
                 frontier.add(Node(state=actor, parent=node, action=movie))
- 
+
+
+def shortest_path_tree(source, targets):
+    """
+    Breadth first search from source until every person in targets
+    has been reached.
+
+    Returns a dictionary mapping each target to the shortest list of
+    (movie_id, person_id) pairs connecting it to source, or None if
+    it can't be reached.
+    """
+    if graph is not None:
+        index = graph.person_index
+        parent, via = graph.bfs(index[source], {index[t] for t in targets})
+        return {target: graph.path_to(parent, via, index[source], index[target])
+                for target in targets}
+
+    # Maps each reached person to the (movie_id, person_id) step before it
+    parents = {source: None}
+    remaining = set(targets) - {source}
+    frontier = QueueFrontier()
+    frontier.add(Node(state=source, parent=None, action=None))
+    stats.searches += 1
+    while remaining and not frontier.empty():
+        stats.record(frontier=len(frontier.frontier))
+        node = frontier.remove()
+        neighbors = neighbors_for_person(node.state)
+        stats.record(expanded=1, neighbors=len(neighbors))
+        for movie, actor in neighbors:
+            if actor not in parents:
+                parents[actor] = (movie, node.state)
+                remaining.discard(actor)
+                frontier.add(Node(state=actor, parent=node, action=movie))
+
+    paths = {}
+    for target in targets:
+        if target not in parents:
+            paths[target] = None
+            continue
+        path = []
+        person = target
+        while parents[person] is not None:
+            movie, previous = parents[person]
+            path.append((movie, person))
+            person = previous
+        path.reverse()
+        paths[target] = path
+    return paths
+
+
+def batch_paths(pairs, lines=None):
+    """
+    Answers many (source name, target name) pairs, running one search per
+    distinct source that serves all of its targets.
+
+    Yields (line, source name, target name, result) as each source's
+    search finishes, where line is the pair's number in lines (by default
+    its position in pairs, from 1) and result is a path as returned by
+    shortest_path, or one of the strings "not found" or "ambiguous" if a
+    name doesn't resolve to one person.
+    """
+    if lines is None:
+        lines = range(1, len(pairs) + 1)
+    groups = {}
+    for line, (source_name, target_name) in zip(lines, pairs):
+        source = _resolve_name(source_name)
+        target = _resolve_name(target_name)
+        if source in ("not found", "ambiguous"):
+            yield line, source_name, target_name, source
+        elif target in ("not found", "ambiguous"):
+            yield line, source_name, target_name, target
+        else:
+            groups.setdefault(source, []).append(
+                (line, source_name, target_name, target))
+
+    for source, queries in groups.items():
+        paths = shortest_path_tree(source, {query[3] for query in queries})
+        for line, source_name, target_name, target in queries:
+            yield line, source_name, target_name, paths[target]
+
+
+def run_batch(infile, outfile):
+    """
+    Reads source,target name pairs as CSV from infile and writes one
+    tab separated line per pair to outfile: the input line number, both
+    names, the degrees of separation (or why there is no answer) and the
+    path as alternating names and movie titles.
+    """
+    pairs = []
+    lines = []
+    reader = csv.reader(infile)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != 2:
+            sys.exit(f"Expected a source,target pair, got: {','.join(row)}")
+        pairs.append(row)
+        # The line the row ends on, counting blank lines skipped
+        lines.append(reader.line_num)
+
+    for line, source_name, target_name, path in batch_paths(pairs, lines):
+        if path is None:
+            answer, steps = "not connected", ""
+        elif isinstance(path, str):
+            answer, steps = path, ""
+        else:
+            answer = str(len(path))
+            steps = " ".join(f"[{movies[movie]['title']}] {people[person]['name']}"
+                             for movie, person in path)
+        print(line, source_name, target_name, answer, steps,
+              sep="\t", file=outfile, flush=True)
+
+
+def _resolve_name(name):
+    """
+    Returns the one person_id for name without prompting, or "not found"
+    or "ambiguous" when there isn't exactly one.
+    """
+    person_ids = names.get(name.strip().lower(), set())
+    if not person_ids:
+        return "not found"
+    if len(person_ids) > 1:
+        return "ambiguous"
+    return next(iter(person_ids))
+
+
+def shortest_path_bidirectional(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching outwards from
+    both ends one whole level at a time and meeting in the middle.
+
+    If no possible path, returns None.
+    """
+    stats.searches += 1
+    if source == target:
+        return []
+
+    # Each side maps a reached person to the (movie_id, person_id) step
+    # leading back towards where that side started, plus its depth
+    forward = {source: None}
+    backward = {target: None}
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        # Always grow the smaller side, it's the cheaper level to expand
+        expand_forward = len(forward_frontier) <= len(backward_frontier)
+        if expand_forward:
+            frontier, parents, depth = forward_frontier, forward, forward_depth
+            other_depth = backward_depth
+        else:
+            frontier, parents, depth = backward_frontier, backward, backward_depth
+            other_depth = forward_depth
+
+        # Finish the whole level before stopping, a later meeting in the
+        # same level can still be shorter than the first one found
+        best = None
+        next_frontier = []
+        stats.record(frontier=len(forward_frontier) + len(backward_frontier))
+        for person in frontier:
+            neighbors = neighbors_for_person(person)
+            stats.record(expanded=1, neighbors=len(neighbors))
+            for movie, actor in neighbors:
+                if actor in other_depth:
+                    length = depth[person] + 1 + other_depth[actor]
+                    if best is None or length < best[0]:
+                        best = (length, person, movie, actor)
+                if actor not in parents:
+                    parents[actor] = (movie, person)
+                    depth[actor] = depth[person] + 1
+                    next_frontier.append(actor)
+
+        if best is not None:
+            _, person, movie, actor = best
+            if expand_forward:
+                return _join_paths(forward, backward, person, movie, actor)
+            return _join_paths(forward, backward, actor, movie, person)
+
+        if expand_forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
+
+def _join_paths(forward, backward, meet_source, movie, meet_target):
+    """
+    Stitches the two halves of a bidirectional search together, where
+    meet_source was reached from the source, meet_target from the target
+    and the two starred together in movie.
+    """
+    path = []
+    person = meet_source
+    while forward[person] is not None:
+        step_movie, previous = forward[person]
+        path.append((step_movie, person))
+        person = previous
+    path.reverse()
+
+    path.append((movie, meet_target))
+    person = meet_target
+    while backward[person] is not None:
+        step_movie, following = backward[person]
+        path.append((step_movie, following))
+        person = following
+    return path
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -143,11 +611,54 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def candidates_for_name(query, limit=10):
+    """
+    Returns up to limit (person_id, name, birth) candidates for a partial
+    or misspelled name, best first, without prompting.
+    """
+    global name_index
+    if name_index is None:
+        if graph is not None:
+            name_index = NameIndex(
+                graph.person_ids, graph.person_names,
+                [graph.person_offsets[i + 1] - graph.person_offsets[i]
+                 for i in range(len(graph.person_ids))])
+        else:
+            person_ids = list(people)
+            name_index = NameIndex(
+                person_ids,
+                [people[id]["name"] for id in person_ids],
+                [len(people[id]["movies"]) for id in person_ids])
+    return [(person_id, name, people[person_id]["birth"])
+            for person_id, name in name_index.lookup(query, limit)]
+
+
+def not_found_message(name):
+    """
+    Returns the message for a name that didn't resolve to a person,
+    suggesting similar names if it matched nobody at all.
+    """
+    if name.lower() in names:
+        return "Person not found."
+    suggestions = candidates_for_name(name, 5)
+    if not suggestions:
+        return "Person not found."
+    listed = ", ".join(f"{candidate} ({birth})"
+                       for _, candidate, birth in suggestions)
+    return f"Person not found. Did you mean: {listed}?"
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        person = graph.person_index[person_id]
+        return {(graph.movie_ids[movie], graph.person_ids[star])
+                for movie in graph.movies_for_person(person)
+                for star in graph.stars_for_movie(movie)}
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
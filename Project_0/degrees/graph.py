@@ -0,0 +1,488 @@
+import csv
+import hashlib
+import itertools
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from functools import cached_property
+
+from instrument import stats
+
+
+class Graph():
+    """
+    Compact person-movie graph.
+
+    Person and movie IDs are interned to dense integers (their row order
+    in the CSV files), and the bipartite star relation is stored twice in
+    compressed-sparse-row form: person_movies[person_offsets[p]:
+    person_offsets[p + 1]] are the movies person p starred in, and
+    movie_stars[movie_offsets[m]:movie_offsets[m + 1]] the people who
+    starred in movie m.
+
+    IDs and names are looked up by binary search over person_order,
+    movie_order and name_order, the indices sorted by person ID, movie ID
+    and lowercased name. A snapshot stores these ready sorted, so nothing
+    has to be built when it is loaded; otherwise they are sorted on first
+    use.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 person_order=None, movie_order=None, name_order=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        # Given orders shadow the cached properties that sort them
+        if person_order is not None:
+            self.person_order = person_order
+        if movie_order is not None:
+            self.movie_order = movie_order
+        if name_order is not None:
+            self.name_order = name_order
+
+    @cached_property
+    def person_order(self):
+        """Person indices sorted by person ID."""
+        return _sorted_indices(self.person_ids)
+
+    @cached_property
+    def movie_order(self):
+        """Movie indices sorted by movie ID."""
+        return _sorted_indices(self.movie_ids)
+
+    @cached_property
+    def name_order(self):
+        """Person indices sorted by lowercased name."""
+        return _sorted_indices(self.person_names, str.lower)
+
+    @cached_property
+    def fingerprint(self):
+        """
+        Hash of the person IDs and the movies each person starred in,
+        which tells apart graphs loaded from different (or differently
+        filtered) data.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for data in encode_strings(self.person_ids):
+            digest.update(data)
+        digest.update(self.person_offsets)
+        digest.update(self.person_movies)
+        return digest.hexdigest()
+
+    @cached_property
+    def person_index(self):
+        """Maps person_ids to their index."""
+        return SortedIndex(self.person_ids, self.person_order)
+
+    @cached_property
+    def movie_index(self):
+        """Maps movie_ids to their index."""
+        return SortedIndex(self.movie_ids, self.movie_order)
+
+    @classmethod
+    def from_data(cls, people, movies):
+        """
+        Builds a graph from the people and movies dictionaries
+        filled in by degrees.load_data.
+        """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        person_index = {id: i for i, id in enumerate(person_ids)}
+        movie_index = {id: i for i, id in enumerate(movie_ids)}
+
+        person_offsets, person_movies = _csr(
+            [[movie_index[movie_id] for movie_id in people[id]["movies"]]
+             for id in person_ids])
+        movie_offsets, movie_stars = _csr(
+            [[person_index[person_id] for person_id in movies[id]["stars"]]
+             for id in movie_ids])
+
+        return cls(
+            person_ids,
+            [people[id]["name"] for id in person_ids],
+            [people[id]["birth"] for id in person_ids],
+            movie_ids,
+            [movies[id]["title"] for id in movie_ids],
+            [movies[id]["year"] for id in movie_ids],
+            person_offsets, person_movies, movie_offsets, movie_stars
+        )
+
+    def people_count(self):
+        return len(self.person_ids)
+
+    def movies_count(self):
+        return len(self.movie_ids)
+
+    def movies_for_person(self, person):
+        """
+        Returns the indices of the movies person (an index) starred in.
+        """
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_for_movie(self, movie):
+        """
+        Returns the indices of the people who starred in movie (an index).
+        """
+        return self.movie_stars[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def bfs(self, source, targets=None):
+        """
+        Breadth first search from the person index source, stopping early
+        once every index in targets has been reached.
+
+        Returns the parent person and parent movie arrays of the search tree,
+        with -1 for people that were not reached (and for source itself).
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        parent = array("i", [-1]) * len(self.person_ids)
+        via = array("i", [-1]) * len(self.person_ids)
+        seen = bytearray(len(self.person_ids))
+        # Every star of a movie is queued the first time the movie is
+        # expanded, so no movie ever needs expanding twice
+        expanded = bytearray(len(self.movie_ids))
+
+        stats.searches += 1
+        remaining = None if targets is None else set(targets) - {source}
+        if remaining is not None and not remaining:
+            return parent, via
+
+        seen[source] = 1
+        queue = array("i", [source])
+        head = 0
+        peak = 1
+        generated = 0
+        while head < len(queue):
+            if len(queue) - head > peak:
+                peak = len(queue) - head
+            person = queue[head]
+            head += 1
+            for k in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[k]
+                if expanded[movie]:
+                    continue
+                expanded[movie] = 1
+                generated += movie_offsets[movie + 1] - movie_offsets[movie]
+                for n in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    star = movie_stars[n]
+                    if seen[star]:
+                        continue
+                    seen[star] = 1
+                    parent[star] = person
+                    via[star] = movie
+                    if remaining is not None and star in remaining:
+                        remaining.discard(star)
+                        if not remaining:
+                            stats.record(head, peak, generated)
+                            return parent, via
+                    queue.append(star)
+        stats.record(head, peak, generated)
+        return parent, via
+
+    def distances(self, source):
+        """
+        Returns an array of the degrees of separation between the person
+        index source and every person, with -1 for people not connected.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        distance = array("i", [-1]) * len(self.person_ids)
+        expanded = bytearray(len(self.movie_ids))
+
+        stats.searches += 1
+        distance[source] = 0
+        queue = array("i", [source])
+        head = 0
+        peak = 1
+        generated = 0
+        while head < len(queue):
+            if len(queue) - head > peak:
+                peak = len(queue) - head
+            person = queue[head]
+            head += 1
+            next_distance = distance[person] + 1
+            for k in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[k]
+                if expanded[movie]:
+                    continue
+                expanded[movie] = 1
+                generated += movie_offsets[movie + 1] - movie_offsets[movie]
+                for n in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    star = movie_stars[n]
+                    if distance[star] == -1:
+                        distance[star] = next_distance
+                        queue.append(star)
+        stats.record(head, peak, generated)
+        return distance
+
+    def path_to(self, parent, via, source, target):
+        """
+        Walks a search tree from bfs back from target to source and
+        returns the (movie_id, person_id) pairs connecting them,
+        or None if target was not reached.
+        """
+        if source == target:
+            return []
+        if parent[target] == -1:
+            return None
+        path = []
+        person = target
+        while person != source:
+            path.append((self.movie_ids[via[person]], self.person_ids[person]))
+            person = parent[person]
+        path.reverse()
+        return path
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the person IDs source and target.
+
+        If no possible path, returns None.
+        """
+        source = self.person_index[source]
+        target = self.person_index[target]
+        parent, via = self.bfs(source, {target})
+        return self.path_to(parent, via, source, target)
+
+
+class SortedIndex(Mapping):
+    """
+    Read-only map from the values of a sequence to their index, by
+    binary search over order, the indices sorted by value.
+    """
+
+    def __init__(self, values, order):
+        self.values = values
+        self.order = order
+
+    def __getitem__(self, value):
+        order = self.order
+        i = bisect_left(order, value, key=self.values.__getitem__)
+        if i < len(order) and self.values[order[i]] == value:
+            return order[i]
+        raise KeyError(value)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class NamesView(Mapping):
+    """
+    Read-only stand-in for degrees.names backed by a Graph, mapping
+    lowercased names to a set of corresponding person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def _lowered(self, person):
+        return self.graph.person_names[person].lower()
+
+    def __getitem__(self, name):
+        graph = self.graph
+        order = graph.name_order
+        start = bisect_left(order, name, key=self._lowered)
+        end = bisect_right(order, name, lo=start, key=self._lowered)
+        if start == end:
+            raise KeyError(name)
+        return {graph.person_ids[order[i]] for i in range(start, end)}
+
+    def __iter__(self):
+        previous = None
+        for person in self.graph.name_order:
+            name = self._lowered(person)
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class PeopleView(Mapping):
+    """
+    Read-only stand-in for degrees.people backed by a Graph, mapping
+    person_ids to a dictionary of: name, birth, movies (a set of movie_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie]
+                       for movie in graph.movies_for_person(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+
+class MoviesView(Mapping):
+    """
+    Read-only stand-in for degrees.movies backed by a Graph, mapping
+    movie_ids to a dictionary of: title, year, stars (a set of person_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[person]
+                      for person in graph.stars_for_movie(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+
+def encode_strings(values):
+    """
+    Returns a sequence of strings as one UTF-8 blob and an array of the
+    offsets of each string in it, with a final offset for the blob's end.
+    """
+    # A snapshot's StringTable already holds them that way
+    if hasattr(values, "blob"):
+        return values.blob, values.offsets
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = array("q", itertools.accumulate(map(len, encoded), initial=0))
+    return b"".join(encoded), offsets
+
+
+def _sorted_indices(values, key=None):
+    """
+    Returns an array of the indices of values, sorted by value
+    (or by key of the value).
+    """
+    if key is None:
+        return array("i", sorted(range(len(values)), key=values.__getitem__))
+    return array("i", sorted(range(len(values)),
+                             key=lambda i: key(values[i])))
+
+
+def _csr(rows):
+    """
+    Packs a list of integer lists into (offsets, values) arrays,
+    dropping duplicates within a row.
+    """
+    offsets = array("i", [0])
+    values = array("i")
+    for row in rows:
+        values.extend(sorted(set(row)))
+        offsets.append(len(values))
+    return offsets, values
+
+
+def load_graph(directory):
+    """
+    Load data from CSV files straight into a Graph, without building
+    the intermediate per-person and per-movie sets.
+    """
+    person_ids, person_names, person_births = [], [], []
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            person_ids.append(row["id"])
+            person_names.append(row["name"])
+            person_births.append(row["birth"])
+
+    movie_ids, movie_titles, movie_years = [], [], []
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            movie_ids.append(row["id"])
+            movie_titles.append(row["title"])
+            movie_years.append(row["year"])
+
+    person_index = {id: i for i, id in enumerate(person_ids)}
+    movie_index = {id: i for i, id in enumerate(movie_ids)}
+
+    # Collect the edges as two flat columns, skipping unknown IDs
+    edge_people = array("i")
+    edge_movies = array("i")
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            person = person_index.get(row["person_id"])
+            movie = movie_index.get(row["movie_id"])
+            if person is None or movie is None:
+                continue
+            edge_people.append(person)
+            edge_movies.append(movie)
+
+    person_offsets, person_movies = _edges_to_csr(
+        edge_people, edge_movies, len(person_ids))
+    movie_offsets, movie_stars = _edges_to_csr(
+        edge_movies, edge_people, len(movie_ids))
+
+    return Graph(person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars)
+
+
+def _edges_to_csr(sources, targets, count):
+    """
+    Counting sort of an edge list into (offsets, values) arrays grouped
+    by source, dropping duplicate edges.
+    """
+    offsets = array("i", [0]) * (count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    values = array("i", [0]) * len(sources)
+    cursor = offsets[:-1]
+    for source, target in zip(sources, targets):
+        values[cursor[source]] = target
+        cursor[source] += 1
+
+    # Compact each row in place to its sorted, distinct values
+    compacted = array("i", [0]) * (count + 1)
+    end = 0
+    for i in range(count):
+        row = sorted(set(values[offsets[i]:offsets[i + 1]]))
+        values[end:end + len(row)] = array("i", row)
+        end += len(row)
+        compacted[i + 1] = end
+    del values[end:]
+    return compacted, values
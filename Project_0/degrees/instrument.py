@@ -0,0 +1,70 @@
+import time
+from contextlib import contextmanager
+
+
+class SearchStats():
+    """
+    Counters describing the work done by searches, plus the wall time
+    spent in each named phase (loading, searching, ...).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.reset_counters()
+        self.timings = {}
+
+    def reset_counters(self):
+        """Zeroes the counters, keeping the phase timings."""
+        self.searches = 0
+        self.nodes_expanded = 0
+        self.frontier_peak = 0
+        self.neighbors_generated = 0
+
+    def record(self, expanded=0, frontier=0, neighbors=0):
+        """
+        Adds expanded nodes and generated neighbors to the totals, and
+        raises the frontier peak to frontier if it is larger.
+        """
+        self.nodes_expanded += expanded
+        self.neighbors_generated += neighbors
+        if frontier > self.frontier_peak:
+            self.frontier_peak = frontier
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the body of a with block, adding it to the named phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (self.timings.get(name, 0.0)
+                                  + time.perf_counter() - start)
+
+    def as_dict(self):
+        return {
+            "searches": self.searches,
+            "nodes_expanded": self.nodes_expanded,
+            "frontier_peak": self.frontier_peak,
+            "neighbors_generated": self.neighbors_generated,
+            "timings": dict(self.timings),
+        }
+
+    def report(self):
+        """Returns the counters and timings as printable lines."""
+        lines = [
+            f"Searches: {self.searches}",
+            f"Nodes expanded: {self.nodes_expanded}",
+            f"Frontier peak: {self.frontier_peak}",
+            f"Neighbors generated: {self.neighbors_generated}",
+        ]
+        for name, seconds in self.timings.items():
+            lines.append(f"Time {name}: {seconds:.4f}s")
+        return "\n".join(lines)
+
+
+# Shared by every search in degrees.py, graph.py and landmarks.py
+stats = SearchStats()
@@ -0,0 +1,250 @@
+import heapq
+import json
+import os
+import random
+import sys
+from array import array
+
+from instrument import stats
+from snapshot import source_stamps
+
+# Each graph (differently filtered ones included) gets its own index file
+LANDMARKS_NAME = "landmarks-{}.index"
+MAGIC = b"LANDMRK2"
+STRATEGIES = ("degree", "farthest", "random")
+
+
+def landmarks_path(graph, directory):
+    return os.path.join(directory, LANDMARKS_NAME.format(graph.fingerprint))
+
+
+class LandmarkIndex():
+    """
+    Breadth first search distances from a handful of landmark people,
+    used to bound the degrees of separation between any two people with
+    the triangle inequality: for every landmark l,
+        |d(l, s) - d(l, t)| <= d(s, t) <= d(l, s) + d(l, t)
+    """
+
+    def __init__(self, graph, landmarks, distances, strategy=None):
+        self.graph = graph
+        self.strategy = strategy
+        # Person indices of the landmarks
+        self.landmarks = landmarks
+        # distances[k][p] is the distance from landmarks[k] to person p,
+        # or -1 if they aren't connected
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=16, strategy="degree", seed=0):
+        """
+        Picks count landmarks from graph and searches from each of them.
+
+        The "degree" strategy picks the people with the most movies,
+        "farthest" starts from that person and then repeatedly picks the
+        person furthest from every landmark so far, and "random" picks
+        people at random.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown landmark strategy {strategy}")
+        people = len(graph.person_ids)
+        count = min(count, people)
+
+        def movie_count(person):
+            return graph.person_offsets[person + 1] - graph.person_offsets[person]
+
+        landmarks = []
+        distances = []
+        if strategy == "degree":
+            landmarks = sorted(range(people), key=movie_count,
+                               reverse=True)[:count]
+            distances = [graph.distances(landmark) for landmark in landmarks]
+        elif strategy == "random":
+            landmarks = random.Random(seed).sample(range(people), count)
+            distances = [graph.distances(landmark) for landmark in landmarks]
+        else:
+            # Unreached people count as infinitely far, so each new
+            # component gets a landmark before any is revisited
+            nearest = [sys.maxsize] * people
+            candidate = max(range(people), key=movie_count, default=None)
+            while candidate is not None and len(landmarks) < count:
+                landmarks.append(candidate)
+                distances.append(graph.distances(candidate))
+                for person, distance in enumerate(distances[-1]):
+                    if distance >= 0 and distance < nearest[person]:
+                        nearest[person] = distance
+                candidate = max(range(people), key=nearest.__getitem__)
+                if nearest[candidate] == 0:
+                    candidate = None
+
+        return cls(graph, landmarks, distances, strategy)
+
+    @classmethod
+    def load(cls, graph, directory):
+        """
+        Returns the index saved in directory for graph, or None if
+        there is none or the CSV files have changed since it was built.
+        """
+        try:
+            with open(landmarks_path(graph, directory), "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return None
+                length = int.from_bytes(f.read(8), "little")
+                header = json.loads(f.read(length).decode("utf-8"))
+                if (header["sources"] != source_stamps(directory)
+                        or header["byteorder"] != sys.byteorder
+                        or header["graph"] != graph.fingerprint
+                        or header["people"] != len(graph.person_ids)):
+                    return None
+                distances = []
+                for _ in header["landmarks"]:
+                    row = array("h")
+                    row.fromfile(f, header["people"])
+                    distances.append(row)
+                landmarks = [graph.person_index[id]
+                             for id in header["landmarks"]]
+        except (OSError, EOFError, ValueError, KeyError):
+            return None
+        return cls(graph, landmarks, distances, header["strategy"])
+
+    def save(self, directory):
+        """
+        Writes the index to directory, next to the CSV files it was
+        built from.
+        """
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "sources": source_stamps(directory),
+            "graph": self.graph.fingerprint,
+            "people": len(self.graph.person_ids),
+            "strategy": self.strategy,
+            "landmarks": [self.graph.person_ids[landmark]
+                          for landmark in self.landmarks],
+        }).encode("utf-8")
+        path = landmarks_path(self.graph, directory)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for row in self.distances:
+                array("h", row).tofile(f)
+        os.replace(temporary, path)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        the person indices source and target. lower is None if some
+        landmark proves they aren't connected, and upper is None if no
+        landmark reaches both of them.
+        """
+        if source == target:
+            return 0, 0
+        lower = 1
+        upper = None
+        for row in self.distances:
+            s = row[source]
+            t = row[target]
+            if s < 0 and t < 0:
+                continue
+            if s < 0 or t < 0:
+                return None, None
+            lower = max(lower, abs(s - t))
+            if upper is None or s + t < upper:
+                upper = s + t
+        return lower, upper
+
+    def estimate(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        the person IDs source and target, as for bounds.
+        """
+        index = self.graph.person_index
+        return self.bounds(index[source], index[target])
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the person IDs source and target, using an A* search
+        guided by the landmark lower bounds.
+
+        If no possible path, returns None.
+        """
+        graph = self.graph
+        source = graph.person_index[source]
+        target = graph.person_index[target]
+        if source == target:
+            return []
+
+        lower, _ = self.bounds(source, target)
+        if lower is None:
+            return None
+
+        # Landmark distances to the target, for the heuristic
+        targets = [(row, row[target]) for row in self.distances
+                   if row[target] >= 0]
+
+        def heuristic(person):
+            best = 0
+            for row, t in targets:
+                s = row[person]
+                if s >= 0 and abs(s - t) > best:
+                    best = abs(s - t)
+            return best
+
+        person_offsets = graph.person_offsets
+        person_movies = graph.person_movies
+        movie_offsets = graph.movie_offsets
+        movie_stars = graph.movie_stars
+
+        # The landmark bound is consistent, so a person's first pop
+        # from the heap is along a shortest path
+        stats.searches += 1
+        cost = {source: 0}
+        parent = {source: None}
+        closed = set()
+        heap = [(lower, 0, source)]
+        while heap:
+            stats.record(frontier=len(heap))
+            _, g, person = heapq.heappop(heap)
+            if person in closed:
+                continue
+            if person == target:
+                break
+            closed.add(person)
+            stats.record(expanded=1)
+            for k in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[k]
+                stats.record(neighbors=movie_offsets[movie + 1]
+                             - movie_offsets[movie])
+                for n in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    star = movie_stars[n]
+                    if star in closed or cost.get(star, g + 2) <= g + 1:
+                        continue
+                    cost[star] = g + 1
+                    parent[star] = (movie, person)
+                    heapq.heappush(heap, (g + 1 + heuristic(star), g + 1, star))
+        else:
+            return None
+
+        path = []
+        person = target
+        while parent[person] is not None:
+            movie, previous = parent[person]
+            path.append((graph.movie_ids[movie], graph.person_ids[person]))
+            person = previous
+        path.reverse()
+        return path
+
+
+def landmark_index(graph, directory, count=16, strategy="degree"):
+    """
+    Returns the saved landmark index for directory, building and saving
+    one first if needed.
+    """
+    index = LandmarkIndex.load(graph, directory)
+    if (index is None or index.strategy != strategy
+            or len(index.landmarks) != min(count, len(graph.person_ids))):
+        index = LandmarkIndex.build(graph, count, strategy)
+        index.save(directory)
+    return index
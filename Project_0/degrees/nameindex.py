@@ -0,0 +1,242 @@
+import bisect
+import heapq
+import unicodedata
+from array import array
+from collections import Counter
+
+# Postings counted when gathering fuzzy candidates, beyond those of the
+# rarest trigram, so the cost of a search doesn't grow with the index
+FUZZY_POSTINGS = 10000
+
+# Fuzzy candidates scored per result wanted, taking those sharing the
+# most trigrams with the query, whatever the size of the index
+FUZZY_CANDIDATES = 5
+
+# Added to the rank of keys that are a whole name, so they come before
+# word suffixes whatever their popularity
+WHOLE_NAME = 1 << 40
+
+
+class NameIndex():
+    """
+    Lookup structure over people's names for autocompletion.
+
+    Holds a sorted array of every normalised name and of every word
+    suffix of it ("tom hanks" and "hanks"), for prefix search with bisect,
+    plus a trigram index over whole names for typo tolerant search.
+
+    Every key is ranked (whole names first, then by popularity) and a
+    tournament tree over the sorted keys holds the best ranked key of
+    each range, so the best matches for a prefix are picked from its
+    whole range of keys in O(limit log n), however many there are.
+    """
+
+    def __init__(self, person_ids, person_names, popularity=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        # Tie breaker between equally good candidates, e.g. movie counts
+        self.popularity = popularity
+
+        self.normalised = [normalise(name) for name in person_names]
+
+        keys = []
+        for person, name in enumerate(self.normalised):
+            start = 0
+            while True:
+                keys.append((name[start:], person))
+                start = name.find(" ", start) + 1
+                if not start:
+                    break
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.key_people = array("i", [person for _, person in keys])
+
+        self.ranks = array("q", [
+            self._popularity(person)
+            + (WHOLE_NAME if len(key) == len(self.normalised[person]) else 0)
+            for key, person in keys])
+        del keys
+
+        # tree[1] is the best key overall and tree[i] the better of
+        # tree[2i] and tree[2i + 1], with the keys as leaves from tree[size]
+        size = 1
+        while size < len(self.keys):
+            size *= 2
+        tree = array("i", [-1]) * (2 * size)
+        tree[size:size + len(self.keys)] = array("i", range(len(self.keys)))
+        ranks = self.ranks
+        for i in range(size - 1, 0, -1):
+            left, right = tree[2 * i], tree[2 * i + 1]
+            if right == -1 or (left != -1 and ranks[left] >= ranks[right]):
+                tree[i] = left
+            else:
+                tree[i] = right
+        self.size = size
+        self.tree = tree
+
+        postings = {}
+        for person, name in enumerate(self.normalised):
+            for trigram in trigrams(name):
+                postings.setdefault(trigram, array("i")).append(person)
+        self.postings = postings
+
+    def exact(self, query):
+        """
+        Returns the indices of people whose name is query, most
+        popular first.
+        """
+        query = normalise(query)
+        start = bisect.bisect_left(self.keys, query)
+        end = bisect.bisect_right(self.keys, query, start)
+        found = []
+        for best in self._ranked(start, end):
+            # Whole names rank above every word suffix
+            if self.ranks[best] < WHOLE_NAME:
+                break
+            found.append(self.key_people[best])
+        return found
+
+    def prefix(self, query, limit=10):
+        """
+        Returns up to limit indices of people with a name, or a word of
+        their name onwards, starting with query, whole names first and
+        then the most popular.
+        """
+        query = normalise(query)
+        if not query:
+            return []
+        start = bisect.bisect_left(self.keys, query)
+        end = bisect.bisect_left(self.keys, query + "\U0010ffff", start)
+        found = []
+        seen = set()
+        for best in self._ranked(start, end):
+            person = self.key_people[best]
+            if person not in seen:
+                seen.add(person)
+                found.append(person)
+                if len(found) == limit:
+                    break
+        return found
+
+    def _ranked(self, start, end):
+        """
+        Yields the positions of keys[start:end], best ranked first.
+
+        Taking the best key of a range leaves the two ranges either side
+        of it, so each key yielded costs O(log n).
+        """
+        ranges = []
+
+        def push(start, end):
+            if start < end:
+                best = self._best(start, end)
+                heapq.heappush(ranges, (-self.ranks[best], best, start, end))
+
+        push(start, end)
+        while ranges:
+            _, best, start, end = heapq.heappop(ranges)
+            yield best
+            push(start, best)
+            push(best + 1, end)
+
+    def _best(self, start, end):
+        """
+        Returns the position of the best ranked key in keys[start:end].
+        """
+        tree, ranks = self.tree, self.ranks
+        best = -1
+        start += self.size
+        end += self.size
+        while start < end:
+            if start & 1:
+                if best == -1 or ranks[tree[start]] > ranks[best]:
+                    best = tree[start]
+                start += 1
+            if end & 1:
+                end -= 1
+                if best == -1 or ranks[tree[end]] > ranks[best]:
+                    best = tree[end]
+            start //= 2
+            end //= 2
+        return best
+
+    def fuzzy(self, query, limit=10):
+        """
+        Returns up to limit indices of people with names similar to query,
+        most similar first, tolerating typos.
+        """
+        query = normalise(query)
+        wanted = trigrams(query)
+        if not wanted:
+            return []
+
+        counts = Counter()
+        usable = [t for t in wanted if t in self.postings]
+        if not usable:
+            return []
+        usable.sort(key=lambda t: len(self.postings[t]))
+        # Rarest first, as those tell names apart best
+        budget = FUZZY_POSTINGS + len(self.postings[usable[0]])
+        for trigram in usable:
+            posting = self.postings[trigram]
+            if len(posting) > budget:
+                break
+            budget -= len(posting)
+            counts.update(posting)
+
+        # Only score candidates sharing as many trigrams as the best one
+        # bar a typo's worth, roughly three trigrams per edit
+        candidates = counts.most_common(FUZZY_CANDIDATES * limit)
+        threshold = max(1, candidates[0][1] - 3)
+        scored = []
+        for person, shared in candidates:
+            if shared < threshold:
+                break
+            name = self.normalised[person]
+            total = len(wanted | trigrams(name))
+            scored.append((-shared / total, -self._popularity(person), person))
+        scored.sort()
+        return [person for _, _, person in scored[:limit]]
+
+    def lookup(self, query, limit=10):
+        """
+        Returns up to limit (person_id, name) candidates for query, ranked
+        exact matches first, then prefix matches, then similar names.
+        """
+        found = []
+
+        def extend(people):
+            for person in people:
+                if len(found) == limit:
+                    break
+                if person not in found:
+                    found.append(person)
+
+        extend(self.exact(query))
+        extend(self.prefix(query, limit))
+        # Similar names are only looked for if too few names matched
+        if len(found) < limit:
+            extend(self.fuzzy(query, limit))
+        return [(self.person_ids[person], self.person_names[person])
+                for person in found]
+
+    def _popularity(self, person):
+        return self.popularity[person] if self.popularity is not None else 0
+
+
+def normalise(name):
+    """
+    Lowercases name, strips accents and collapses whitespace.
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.lower().split())
+
+
+def trigrams(name):
+    """
+    Returns the set of three character substrings of name, padded
+    so that its start and end count as well.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
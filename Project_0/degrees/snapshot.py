@@ -0,0 +1,165 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+from collections.abc import Sequence
+
+from graph import Graph, encode_strings
+
+SNAPSHOT_NAME = "graph.snapshot"
+MAGIC = b"DEGREES2"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Sections of the snapshot, in file order, and whether each holds
+# integer array data or a table of strings
+SECTIONS = (
+    ("person_ids", "strings"),
+    ("person_names", "strings"),
+    ("person_births", "strings"),
+    ("movie_ids", "strings"),
+    ("movie_titles", "strings"),
+    ("movie_years", "strings"),
+    ("person_offsets", "ints"),
+    ("person_movies", "ints"),
+    ("movie_offsets", "ints"),
+    ("movie_stars", "ints"),
+    ("person_order", "ints"),
+    ("movie_order", "ints"),
+    ("name_order", "ints"),
+)
+
+
+class StringTable(Sequence):
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus
+    an array of offsets into it, decoded lazily on access.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def source_stamps(directory):
+    """
+    Returns the (mtime, size) of each CSV file a snapshot is built from,
+    used to tell whether the snapshot is still up to date.
+    """
+    stamps = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        stamps[name] = [stat.st_mtime_ns, stat.st_size]
+    return stamps
+
+
+def write_snapshot(graph, directory):
+    """
+    Writes graph to the snapshot file of directory.
+    """
+    stamps = source_stamps(directory)
+
+    chunks = []
+    for name, kind in SECTIONS:
+        values = getattr(graph, name)
+        if kind == "strings":
+            blob, offsets = encode_strings(values)
+            chunks.append((name + ".offsets", bytes(offsets)))
+            chunks.append((name, bytes(blob)))
+        else:
+            chunks.append((name, array("i", values).tobytes()))
+
+    # Lay sections out after the header, each aligned to 8 bytes
+    layout = {}
+    position = 0
+    for name, data in chunks:
+        layout[name] = [position, len(data)]
+        position += _padding(len(data))
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "sources": stamps,
+        "sections": layout,
+    }).encode("utf-8")
+    start = _padding(len(MAGIC) + 8 + len(header))
+
+    # Write to a temporary file first so a reader never sees half a snapshot
+    path = snapshot_path(directory)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(bytes(start - f.tell()))
+        for name, data in chunks:
+            f.write(data)
+            f.write(bytes(_padding(len(data)) - len(data)))
+    os.replace(temporary, path)
+
+
+def load_snapshot(directory):
+    """
+    Returns the Graph stored in the snapshot file of directory,
+    or None if there is no snapshot or it is out of date.
+
+    The file is memory mapped, so arrays are paged in as they are used.
+    """
+    path = snapshot_path(directory)
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    # A truncated or corrupt snapshot is ignored, so the caller falls back
+    # to the CSV files
+    view = memoryview(buffer)
+    try:
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            return None
+        length = int.from_bytes(view[len(MAGIC):len(MAGIC) + 8], "little")
+        header = json.loads(str(view[len(MAGIC) + 8:len(MAGIC) + 8 + length],
+                                "utf-8"))
+        start = _padding(len(MAGIC) + 8 + length)
+
+        if header["sources"] != source_stamps(directory):
+            return None
+        if header["byteorder"] != sys.byteorder:
+            return None
+
+        def section(name):
+            offset, size = header["sections"][name]
+            if offset < 0 or size < 0 or start + offset + size > len(view):
+                raise ValueError(f"snapshot section {name} is truncated")
+            return view[start + offset:start + offset + size]
+
+        fields = {}
+        for name, kind in SECTIONS:
+            if kind == "strings":
+                fields[name] = StringTable(
+                    section(name), section(name + ".offsets").cast("q"))
+            else:
+                fields[name] = section(name).cast("i")
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return Graph(**fields)
+
+
+def _padding(size):
+    """Rounds size up to a multiple of 8."""
+    return (size + 7) // 8 * 8
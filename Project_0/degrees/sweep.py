@@ -0,0 +1,128 @@
+import argparse
+import multiprocessing
+import random
+import sys
+
+from graph import load_graph
+from snapshot import load_snapshot
+
+# The graph searched by pool workers. With the fork start method it is set
+# in the parent before the pool starts and shared copy-on-write, otherwise
+# each worker maps it in once from the directory's snapshot (or CSVs).
+_graph = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep breadth first searches over many people.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--sample", type=int, metavar="N",
+                        help="search from N random people instead of everyone")
+    parser.add_argument("--person", action="append", metavar="NAME",
+                        help="search from the people with this name "
+                             "(may be repeated)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed for --sample")
+    parser.add_argument("--processes", type=int,
+                        help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    graph = load_snapshot(args.directory) or load_graph(args.directory)
+    print("Data loaded.", file=sys.stderr)
+
+    sources = range(len(graph.person_ids))
+    if args.person:
+        wanted = {name.lower() for name in args.person}
+        sources = [i for i, name in enumerate(graph.person_names)
+                   if name.lower() in wanted]
+        if not sources:
+            sys.exit("Person not found.")
+    if args.sample is not None:
+        sources = random.Random(args.seed).sample(
+            sources, min(args.sample, len(sources)))
+
+    summary = sweep(graph, sources, args.directory, args.processes)
+
+    print(f"Sources: {summary['sources']}")
+    print("Degrees  People reached")
+    for degrees, count in enumerate(summary["histogram"]):
+        print(f"{degrees:7}  {count}")
+    print(f"Mean degrees of separation: {summary['mean']:.3f}")
+    print("Eccentricity  Sources")
+    for eccentricity, count in enumerate(summary["eccentricities"]):
+        if count:
+            print(f"{eccentricity:12}  {count}")
+    print(f"Diameter (lower bound): {summary['diameter']}")
+
+
+def sweep(graph, sources, directory, processes=None):
+    """
+    Runs a breadth first search from every person index in sources
+    across a process pool and aggregates the distances found.
+
+    Returns a dictionary of: sources (how many were searched), histogram
+    (number of (source, person) pairs at each degree of separation, with
+    the source itself at 0), mean (over connected pairs other than the
+    source itself), eccentricities (number of sources with each
+    eccentricity within their component) and diameter (the largest
+    eccentricity seen, a lower bound on the true diameter when sampling).
+    """
+    global _graph
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        _graph = graph
+        initializer, initargs = None, ()
+    else:
+        context = multiprocessing.get_context()
+        initializer, initargs = _load_worker_graph, (directory,)
+
+    histogram = []
+    eccentricities = []
+    count = 0
+    with context.Pool(processes, initializer, initargs) as pool:
+        for counts in pool.imap_unordered(_distance_counts, sources,
+                                          chunksize=16):
+            count += 1
+            if len(counts) > len(histogram):
+                histogram.extend([0] * (len(counts) - len(histogram)))
+            for degrees, reached in enumerate(counts):
+                histogram[degrees] += reached
+            eccentricity = len(counts) - 1
+            if eccentricity >= len(eccentricities):
+                eccentricities.extend(
+                    [0] * (eccentricity + 1 - len(eccentricities)))
+            eccentricities[eccentricity] += 1
+
+    pairs = sum(histogram[1:])
+    return {
+        "sources": count,
+        "histogram": histogram,
+        "mean": sum(d * n for d, n in enumerate(histogram)) / pairs
+        if pairs else 0.0,
+        "eccentricities": eccentricities,
+        "diameter": len(eccentricities) - 1,
+    }
+
+
+def _load_worker_graph(directory):
+    global _graph
+    _graph = load_snapshot(directory) or load_graph(directory)
+
+
+def _distance_counts(source):
+    """
+    Returns the number of people at each degree of separation from source.
+    """
+    counts = []
+    for distance in _graph.distances(source):
+        if distance < 0:
+            continue
+        if distance >= len(counts):
+            counts.extend([0] * (distance + 1 - len(counts)))
+        counts[distance] += 1
+    return counts
+
+
+if __name__ == "__main__":
+    main()
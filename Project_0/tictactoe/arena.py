@@ -0,0 +1,182 @@
+"""
+Headless Tic Tac Toe arena
+
+Plays many games between two players across a process pool and reports
+win/draw rates, per-move latency percentiles and search node counts.
+
+Players are given as:
+    minimax     full minimax (iteratively deepened if --time-limit is set)
+    depth:N     minimax searching N plies deep
+    book        the 3x3 opening book
+    random      a uniformly random legal move
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+import bitboard
+import book
+import tictactoe as ttt
+
+# Players built so far in this worker process, by their spec
+_players = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Tic Tac Toe engines against each other.")
+    parser.add_argument("first", help="player spec, e.g. minimax")
+    parser.add_argument("second", help="player spec, e.g. random or depth:2")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--processes", type=int,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("-k", type=int, help="cells in a row needed to win")
+    parser.add_argument("--time-limit", type=float,
+                        help="seconds per minimax move")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for spec in (args.first, args.second):
+        try:
+            parse_spec(spec)
+        except ValueError as error:
+            parser.error(str(error))
+    if "book" in (args.first, args.second) and (args.rows, args.cols) != (3, 3):
+        parser.error("the book player only plays 3x3 boards")
+
+    k = args.k if args.k is not None else min(args.rows, args.cols)
+    settings = (args.rows, args.cols, k, args.time_limit, args.seed)
+    report = arena(args.first, args.second, args.games, settings,
+                   args.processes)
+    print_report(args.first, args.second, report)
+
+
+def parse_spec(spec):
+    """
+    Returns (kind, depth) for a player spec, raising ValueError
+    if it isn't one.
+    """
+    if spec in ("minimax", "book", "random"):
+        return spec, None
+    if spec.startswith("depth:") and spec[6:].isdigit() and int(spec[6:]) > 0:
+        return "depth", int(spec[6:])
+    raise ValueError(f"unknown player {spec}")
+
+
+def make_player(spec, k, time_limit):
+    """
+    Returns a function taking a board and a random.Random and
+    returning the player's action.
+    """
+    kind, depth = parse_spec(spec)
+    if kind == "random":
+        return lambda board, rng: rng.choice(sorted(ttt.actions(board)))
+    if kind == "book":
+        table = book.load() or book.build()
+
+        def book_player(board, rng):
+            cell, _ = book.lookup(table, *ttt.to_bitboard(board))
+            return divmod(cell, 3)
+        return book_player
+    return lambda board, rng: ttt.minimax(board, k, time_limit, depth)
+
+
+def play_game(task):
+    """
+    Plays one game and returns (number, winner, moves), where winner is
+    "X", "O" or None and moves lists (player spec, seconds, nodes) for
+    every move made.
+    """
+    number, x_spec, o_spec, (rows, cols, k, time_limit, seed) = task
+    rng = random.Random(seed * 1000003 + number)
+    game = bitboard.game(rows, cols, k)
+    specs = {ttt.X: x_spec, ttt.O: o_spec}
+
+    board = ttt.initial_state(rows, cols)
+    moves = []
+    while not ttt.terminal(board, k):
+        spec = specs[ttt.player(board)]
+        key = (spec, k, time_limit)
+        if key not in _players:
+            _players[key] = make_player(spec, k, time_limit)
+        nodes = game.nodes
+        start = time.perf_counter()
+        action = _players[key](board, rng)
+        moves.append((spec, time.perf_counter() - start, game.nodes - nodes))
+        board = ttt.result(board, action)
+    return number, ttt.winner(board, k), moves
+
+
+def arena(first, second, games, settings, processes=None):
+    """
+    Plays games between two player specs, alternating who plays X,
+    and returns a dictionary of: wins (games won per spec, and None for
+    draws), latencies (sorted seconds per move per spec) and nodes
+    (total search nodes per spec).
+    """
+    tasks = [(number,
+              first if number % 2 == 0 else second,
+              second if number % 2 == 0 else first,
+              settings)
+             for number in range(games)]
+
+    wins = {first: 0, second: 0, None: 0}
+    latencies = {first: [], second: []}
+    nodes = {first: 0, second: 0}
+    with multiprocessing.Pool(processes) as pool:
+        for number, winner, moves in pool.imap_unordered(play_game, tasks):
+            _, x_spec, o_spec, _ = tasks[number]
+            if winner == ttt.X:
+                wins[x_spec] += 1
+            elif winner == ttt.O:
+                wins[o_spec] += 1
+            else:
+                wins[None] += 1
+            for spec, seconds, searched in moves:
+                latencies[spec].append(seconds)
+                nodes[spec] += searched
+
+    for spec in latencies:
+        latencies[spec].sort()
+    return {"games": games, "wins": wins, "latencies": latencies,
+            "nodes": nodes}
+
+
+def percentile(ordered, fraction):
+    """
+    Returns the value below which fraction of a sorted list falls.
+    """
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def print_report(first, second, report):
+    games = report["games"]
+    wins = report["wins"]
+    print(f"Games: {games}")
+    if first == second:
+        print(f"Decided: {wins[first]} ({100 * wins[first] / games:.1f}%)")
+    else:
+        for spec in (first, second):
+            print(f"{spec} wins: {wins[spec]} ({100 * wins[spec] / games:.1f}%)")
+    print(f"Draws: {wins[None]} ({100 * wins[None] / games:.1f}%)")
+
+    print(f"{'player':12} {'moves':>7} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9} {'nodes/move':>11}")
+    for spec in dict.fromkeys((first, second)):
+        ordered = report["latencies"][spec]
+        count = len(ordered)
+        print(f"{spec:12} {count:7} "
+              f"{1000 * percentile(ordered, 0.5):9.3f} "
+              f"{1000 * percentile(ordered, 0.9):9.3f} "
+              f"{1000 * percentile(ordered, 0.99):9.3f} "
+              f"{1000 * (ordered[-1] if ordered else 0.0):9.3f} "
+              f"{report['nodes'][spec] / max(1, count):11.1f}")
+
+
+if __name__ == "__main__":
+    main()
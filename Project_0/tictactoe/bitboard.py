@@ -0,0 +1,422 @@
+"""
+Bitboard Tic Tac Toe engine
+
+A position on a board of rows x cols cells is a pair of masks (x, o), one
+per player, where bit cols * i + j is set if that player holds cell (i, j).
+The first player to hold k cells in a row, column or diagonal wins.
+"""
+import time
+from functools import lru_cache
+
+# Value of a won position, above anything the evaluation function returns
+WIN = 1000000
+
+# Evaluation weight of a line holding this many of one player's cells
+# and none of the other's
+LINE_WEIGHTS = (0, 1, 8, 64, 512, 4096, 32768)
+
+# Bound kinds stored in the transposition table
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Transposition tables are cleared once they grow past this many entries
+MAX_TRANSPOSITIONS = 2000000
+
+# Timed searches check the clock every this many nodes (a power of 2 less 1)
+CLOCK_INTERVAL = 1023
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search once its time budget is spent
+    or it has been asked to stop.
+    """
+
+
+class Search():
+    """
+    State of one running search: when it has to finish by, what can ask
+    it to stop and how many nodes it has visited. Each search gets its
+    own, so searches running at once on a shared Game don't clobber each
+    other's deadline or stop event.
+    """
+
+    def __init__(self, deadline=None, stop=None):
+        self.deadline = deadline
+        self.stop = stop
+        self.nodes = 0
+
+    def interrupted(self):
+        """
+        Returns True if the search is out of time or has been asked
+        to stop.
+        """
+        return ((self.deadline is not None
+                 and time.perf_counter() > self.deadline)
+                or (self.stop is not None and self.stop.is_set()))
+
+
+class Game():
+    """
+    Rules, lookup tables and search tables for one board geometry.
+
+    Transpositions, killer moves and history scores are kept across
+    searches, so later moves and later games reuse earlier work. The
+    state of each search itself is kept in a Search.
+    """
+
+    def __init__(self, rows=3, cols=3, k=3):
+        if not 0 < k <= max(rows, cols):
+            raise ValueError(f"can't get {k} in a row on a {rows}x{cols} board")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.full = (1 << self.cells) - 1
+
+        self.win_masks = self._win_masks()
+        # Tables over every mask are only worth building on small boards
+        self.winning = None
+        if self.cells <= 12:
+            self.winning = bytes(self._contains_line(mask)
+                                 for mask in range(self.full + 1))
+
+        # The lines through each cell, so a win only needs checking
+        # along the lines through the move that was just made
+        self.lines_through = {
+            1 << cell: tuple(line for line in self.win_masks
+                             if line >> cell & 1)
+            for cell in range(self.cells)
+        }
+        # Moves touching more lines are tried first, all else being equal
+        self.static_order = {move: len(lines)
+                             for move, lines in self.lines_through.items()}
+        self.symmetry_tables = [self._chunk_tables(symmetry)
+                                for symmetry in self._symmetries()]
+
+        self.transpositions = {}
+        self.killers = {}
+        self.history = {}
+        # Nodes visited by every search so far, for statistics
+        self.nodes = 0
+
+    def _win_masks(self):
+        """
+        Returns a mask for every run of k cells in a row, column
+        or diagonal.
+        """
+        rows, cols, k = self.rows, self.cols, self.k
+        masks = []
+        for i in range(rows):
+            for j in range(cols):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < cols:
+                        masks.append(sum(1 << (cols * (i + di * n) + j + dj * n)
+                                         for n in range(k)))
+        return tuple(masks)
+
+    def _contains_line(self, mask):
+        return any(mask & line == line for line in self.win_masks)
+
+    def _symmetries(self):
+        """
+        Returns the rotations and reflections of the board (8 if it is
+        square, otherwise 4), each a list giving the cell index every
+        cell of the transformed board comes from.
+        """
+        rows, cols = self.rows, self.cols
+        identity = list(range(self.cells))
+        flip_rows = [cols * (rows - 1 - i) + j
+                     for i in range(rows) for j in range(cols)]
+        flip_cols = [cols * i + (cols - 1 - j)
+                     for i in range(rows) for j in range(cols)]
+        half_turn = [flip_rows[cell] for cell in flip_cols]
+        found = [identity, flip_rows, flip_cols, half_turn]
+        if rows == cols:
+            transpose = [cols * j + i for i in range(rows) for j in range(cols)]
+            found += [[symmetry[cell] for cell in transpose]
+                      for symmetry in found]
+        return found
+
+    def _chunk_tables(self, symmetry):
+        """
+        Returns tables mapping each byte of a mask to the bits it becomes
+        under symmetry, so a whole mask is permuted with a few lookups.
+        """
+        tables = []
+        for start in range(0, self.cells, 8):
+            table = []
+            for chunk in range(256):
+                permuted = 0
+                for cell, source in enumerate(symmetry):
+                    offset = source - start
+                    if 0 <= offset < 8 and chunk >> offset & 1:
+                        permuted |= 1 << cell
+                table.append(permuted)
+            tables.append(table)
+        return tables
+
+    def permute(self, tables, mask):
+        permuted = 0
+        for table in tables:
+            permuted |= table[mask & 255]
+            mask >>= 8
+        return permuted
+
+    def canonical_key(self, mine, theirs):
+        """
+        Returns the same integer for a position and all of its rotations
+        and reflections, given the masks of the player to move and of
+        their opponent.
+        """
+        cells = self.cells
+        return min(self.permute(tables, mine) | self.permute(tables, theirs) << cells
+                   for tables in self.symmetry_tables)
+
+    def won(self, mask):
+        """
+        Returns True if mask holds k cells in a row.
+        """
+        if self.winning is not None:
+            return self.winning[mask]
+        return self._contains_line(mask)
+
+    def won_with(self, mask, move):
+        """
+        Returns True if mask holds k cells in a row through move, which
+        is all that needs checking when move was the last one made.
+        """
+        if self.winning is not None:
+            return self.winning[mask]
+        for line in self.lines_through[move]:
+            if mask & line == line:
+                return True
+        return False
+
+    def x_to_move(self, x, o):
+        """
+        Returns True if X has the next turn in position (x, o).
+        """
+        return bin(x).count("1") == bin(o).count("1")
+
+    def moves(self, x, o):
+        """
+        Yields the bit of every empty cell in position (x, o).
+        """
+        empty = self.full & ~(x | o)
+        while empty:
+            move = empty & -empty
+            yield move
+            empty ^= move
+
+    def score(self, x, o):
+        """
+        Returns 1 if X has won position (x, o), -1 if O has won,
+        0 if it is a tie and None if the game isn't over.
+        """
+        if self.won(x):
+            return 1
+        if self.won(o):
+            return -1
+        if x | o == self.full:
+            return 0
+        return None
+
+    def evaluate(self, mine, theirs):
+        """
+        Returns a heuristic value of a position for the player to move:
+        lines still open to a player count for them, more so the more
+        of their cells the line already holds.
+        """
+        value = 0
+        for line in self.win_masks:
+            if line & theirs:
+                if not line & mine:
+                    value -= LINE_WEIGHTS[min(bin(line & theirs).count("1"), 6)]
+            elif line & mine:
+                value += LINE_WEIGHTS[min(bin(line & mine).count("1"), 6)]
+        return value
+
+    def value(self, x, o):
+        """
+        Returns 1 if X wins position (x, o) with perfect play,
+        -1 if O does and 0 if it is a tie.
+        """
+        search = Search()
+        depth = self.cells - bin(x | o).count("1")
+        try:
+            if self.x_to_move(x, o):
+                value = self.negamax(search, x, o, depth, -WIN, WIN, 0)
+            else:
+                value = -self.negamax(search, o, x, depth, -WIN, WIN, 0)
+        finally:
+            self.nodes += search.nodes
+        return (value > 0) - (value < 0)
+
+    def best_move(self, x, o, time_limit=None, max_depth=None,
+                  stop=None, progress=None):
+        """
+        Returns the bit of the best move for the player to move in
+        position (x, o), or None if the game is over.
+
+        Without limits the game tree is searched to the end, so the move
+        is optimal. Otherwise searches are run one ply deeper at a time,
+        up to max_depth plies, until time_limit seconds have passed or
+        stop (a threading.Event) is set, and the move from the deepest
+        search that finished is returned. After each finished search,
+        progress is called with its depth, best move and value.
+        """
+        if self.score(x, o) is not None:
+            return None
+        if self.x_to_move(x, o):
+            mine, theirs = x, o
+        else:
+            mine, theirs = o, x
+        empties = self.cells - bin(x | o).count("1")
+
+        search = Search()
+        if (time_limit is None and max_depth is None
+                and stop is None and progress is None):
+            try:
+                return self.search_root(search, mine, theirs, empties, {})[0]
+            finally:
+                self.nodes += search.nodes
+
+        limit = empties if max_depth is None else min(max_depth, empties)
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        scores = {}
+        best = None
+        try:
+            for depth in range(1, limit + 1):
+                # The first iteration always finishes, so there's a move
+                # to play
+                search.deadline = deadline if depth > 1 else None
+                search.stop = stop if depth > 1 else None
+                try:
+                    best, value = self.search_root(search, mine, theirs,
+                                                   depth, scores)
+                except SearchTimeout:
+                    break
+                if progress is not None:
+                    progress(depth, best, value)
+                if abs(value) >= WIN:
+                    break
+        finally:
+            self.nodes += search.nodes
+        return best
+
+    def search_root(self, search, mine, theirs, depth, scores):
+        """
+        Searches every move of the player to move to depth plies,
+        trying moves in order of their scores from the previous
+        iteration, and records their new scores in scores.
+
+        Returns the best move and its value.
+        """
+        moves = sorted(self.moves(mine, theirs),
+                       key=lambda move: (-scores.get(move, -WIN),
+                                         -self.static_order[move]))
+        empties = self.cells - bin(mine | theirs).count("1") - 1
+        best, alpha = None, -WIN - 1
+        for move in moves:
+            value = -self.negamax(search, theirs, mine | move, depth - 1,
+                                  -WIN - 1, -alpha, 1, move, empties)
+            scores[move] = value
+            if value > alpha:
+                best, alpha = move, value
+        return best, alpha
+
+    def negamax(self, search, mine, theirs, depth, alpha, beta, ply,
+                last=None, empties=None):
+        """
+        Returns the value of a position for the player to move, whose
+        cells are mine, searched depth plies deep with alpha-beta pruning
+        as part of search (a Search).
+
+        last is the opponent's move that led here and empties the number
+        of empty cells, both carried down the search so that checking
+        for the end of the game costs O(1) per node.
+        """
+        search.nodes += 1
+        if not search.nodes & CLOCK_INTERVAL and search.interrupted():
+            raise SearchTimeout()
+
+        # The opponent has just moved, so only they can have won,
+        # and only along a line through their move
+        if last is None:
+            if self.won(theirs):
+                return -WIN
+            empties = self.cells - bin(mine | theirs).count("1")
+        elif self.won_with(theirs, last):
+            return -WIN
+        if not empties:
+            return 0
+        if depth <= 0:
+            return self.evaluate(mine, theirs)
+        depth = min(depth, empties)
+
+        key = self.canonical_key(mine, theirs)
+        entry = self.transpositions.get(key)
+        if entry is not None and entry[0] >= depth:
+            _, value, bound = entry
+            if (bound == EXACT
+                    or (bound == LOWER and value >= beta)
+                    or (bound == UPPER and value <= alpha)):
+                return value
+        alpha_start = alpha
+
+        best = -WIN - 1
+        for move in self.ordered_moves(mine, theirs, ply):
+            value = -self.negamax(search, theirs, mine | move, depth - 1,
+                                  -beta, -alpha, ply + 1, move, empties - 1)
+            if value > best:
+                best = value
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                self.record_cutoff(move, depth, ply)
+                break
+
+        if len(self.transpositions) >= MAX_TRANSPOSITIONS:
+            self.transpositions.clear()
+        if best <= alpha_start:
+            self.transpositions[key] = (depth, best, UPPER)
+        elif best >= beta:
+            self.transpositions[key] = (depth, best, LOWER)
+        else:
+            self.transpositions[key] = (depth, best, EXACT)
+        return best
+
+    def ordered_moves(self, mine, theirs, ply):
+        """
+        Returns the moves of a position, killer moves for this ply first
+        and the rest by history score, then by how many lines they touch.
+        """
+        killers = self.killers.get(ply, ())
+        history = self.history
+        static_order = self.static_order
+        return sorted(self.moves(mine, theirs), key=lambda move: (
+            move not in killers,
+            -history.get(move, 0),
+            -static_order[move],
+        ))
+
+    def record_cutoff(self, move, depth, ply):
+        """
+        Remembers a move that caused a beta cutoff, as a killer move for
+        its ply and in the history scores.
+        """
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+
+@lru_cache(maxsize=None)
+def game(rows=3, cols=3, k=3):
+    """
+    Returns the shared Game for a board geometry.
+    """
+    return Game(rows, cols, k)
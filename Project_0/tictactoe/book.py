@@ -0,0 +1,118 @@
+"""
+Perfect play opening book for 3x3 Tic Tac Toe
+
+Every reachable position is solved once and stored in a table indexed by
+the base 3 encoding of the board (cell 3 * i + j contributes 1 * 3^cell
+for X and 2 * 3^cell for O). Each entry is one byte: the best move's
+cell in the low 4 bits and the position's value plus 1 in the next 2,
+or NO_MOVE for positions that are over or can't be reached.
+"""
+import os
+import sys
+
+import bitboard
+
+CELLS = 9
+POWERS = [3 ** cell for cell in range(CELLS)]
+SIZE = 3 ** CELLS
+NO_MOVE = 0xFF
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+
+def build():
+    """
+    Solves every reachable position and returns the book as bytes.
+
+    Among equally valued moves the book prefers the quickest win or,
+    when losing, the longest resistance.
+    """
+    game = bitboard.game(3, 3, 3)
+    table = bytearray([NO_MOVE]) * SIZE
+    # Maps index to (value for X, plies until the game ends)
+    solved = {}
+
+    def solve(x, o, index, x_turn):
+        if index in solved:
+            return solved[index]
+        final = game.score(x, o)
+        if final is not None:
+            solved[index] = (final, 0)
+            return solved[index]
+
+        best = None
+        for cell in range(CELLS):
+            move = 1 << cell
+            if (x | o) & move:
+                continue
+            if x_turn:
+                value, length = solve(x | move, o, index + POWERS[cell], False)
+            else:
+                value, length = solve(x, o | move, index + 2 * POWERS[cell], True)
+            # Rank moves for the player moving: by value, then a short game
+            # if it is won and a long one if it is not
+            mine = value if x_turn else -value
+            rank = (mine, -length if mine > 0 else length)
+            if best is None or rank > best[0]:
+                best = (rank, cell, value, length + 1)
+
+        _, cell, value, length = best
+        table[index] = cell | (value + 1) << 4
+        solved[index] = (value, length)
+        return solved[index]
+
+    solve(0, 0, 0, True)
+    return bytes(table)
+
+
+def save(table, path=BOOK_PATH):
+    with open(path, "wb") as f:
+        f.write(table)
+
+
+def load(path=BOOK_PATH):
+    """
+    Returns the book stored at path, or None if there isn't a valid one.
+    """
+    try:
+        with open(path, "rb") as f:
+            table = f.read()
+    except OSError:
+        return None
+    return table if len(table) == SIZE else None
+
+
+def index(x, o):
+    """
+    Returns the book index of position (x, o).
+    """
+    total = 0
+    for cell in range(CELLS):
+        if x >> cell & 1:
+            total += POWERS[cell]
+        elif o >> cell & 1:
+            total += 2 * POWERS[cell]
+    return total
+
+
+def lookup(table, x, o):
+    """
+    Returns (cell of the best move, value for X) of position (x, o),
+    or None if the game is over or the position can't be reached.
+    """
+    entry = table[index(x, o)]
+    if entry == NO_MOVE:
+        return None
+    return entry & 0x0F, (entry >> 4) - 1
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else BOOK_PATH
+    table = build()
+    save(table, path)
+    positions = sum(1 for entry in table if entry != NO_MOVE)
+    print(f"Wrote {positions} positions to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,24 @@
+import argparse
 import pygame
 import sys
 import time
 
 import tictactoe as ttt
+from worker import MoveWorker
+
+parser = argparse.ArgumentParser(description="Play Tic Tac Toe.")
+parser.add_argument("--rows", type=int, default=3)
+parser.add_argument("--cols", type=int, default=3)
+parser.add_argument("-k", type=int, help="cells in a row needed to win")
+parser.add_argument("--time-limit", type=float,
+                    help="seconds the computer may think per move "
+                         "(default: unlimited on 3x3, 2 otherwise)")
+args = parser.parse_args()
+rows, cols = args.rows, args.cols
+k = args.k if args.k is not None else min(rows, cols)
+time_limit = args.time_limit
+if time_limit is None and (rows, cols) != (3, 3):
+    time_limit = 2.0
 
 pygame.init()
 size = width, height = 600, 400
@@ -15,16 +31,25 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+tile_size = min(80, (height - 160) // rows, (width - 40) // cols)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
+
+# Answer every AI move from the precomputed opening book
+ttt.load_book()
+
+clock = pygame.time.Clock()
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = ttt.initial_state(rows, cols)
+# Search running for the computer's move, if any
+worker = None
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if worker is not None:
+                worker.cancel()
             sys.exit()
 
     screen.fill(black)
@@ -67,13 +92,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (cols / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(cols):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -89,18 +113,20 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
+        game_over = ttt.terminal(board, k)
         player = ttt.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = ttt.winner(board, k)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
                 title = f"Game Over: {winner} wins."
         elif user == player:
             title = f"Play as {user}"
+        elif worker is not None and worker.depth:
+            title = f"Computer thinking... (depth {worker.depth})"
         else:
             title = f"Computer thinking..."
         title = largeFont.render(title, True, white)
@@ -108,22 +134,21 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, searching in the background so the window
+        # keeps redrawing while the computer thinks
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if worker is None:
+                worker = MoveWorker(board, k, time_limit).start()
+            elif worker.done and worker.elapsed() >= 0.5:
+                board = ttt.result(board, worker.action)
+                worker = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(cols):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -140,7 +165,10 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+                    board = ttt.initial_state(rows, cols)
+                    if worker is not None:
+                        worker.cancel()
+                        worker = None
 
     pygame.display.flip()
+    clock.tick(60)
@@ -1,47 +1,94 @@
 """
 Tic Tac Toe Player
+
+Boards default to 3x3 with 3 in a row to win, but any rows x cols board
+works, and k (the run length needed to win) can be given to the functions
+that depend on it; it defaults to the shorter side of the board.
 """
 import math
-import copy
+
+import bitboard
+import book
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Precomputed best moves for every 3x3 position, once load_book is called
+opening_book = None
 
-def initial_state():
+
+def initial_state(rows=3, cols=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
 
 
-def player(board):
+def load_book(path=book.BOOK_PATH):
     """
-    Returns player who has the next turn on a board.
+    Loads the 3x3 opening book from path, so minimax answers 3x3 boards
+    with a table lookup. Builds the book (and saves it to path, if
+    possible) when there isn't one yet.
+    """
+    global opening_book
+    table = book.load(path)
+    if table is None:
+        table = book.build()
+        try:
+            book.save(table, path)
+        except OSError:
+            pass
+    opening_book = table
+
+
+def game_for(board, k=None):
+    """
+    Returns the bitboard Game matching a board's size.
+    """
+    rows, cols = len(board), len(board[0])
+    return bitboard.game(rows, cols, min(rows, cols) if k is None else k)
+
+
+def to_bitboard(board):
+    """
+    Returns the (x, o) bitboard masks of a board.
     """
-    count_x = count_o = 0
+    x = o = 0
+    bit = 1
     for row in board:
         for cell in row:
-            if cell == X:
-                count_x += 1
-            elif cell == O:
-                count_o += 1
-    return O if count_x > count_o else X
+            if cell is X:
+                x |= bit
+            elif cell is O:
+                o |= bit
+            bit <<= 1
+    return x, o
+
+
+def to_action(board, move):
+    """
+    Returns the (i, j) action of a bitboard move.
+    """
+    return divmod(move.bit_length() - 1, len(board[0]))
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = to_bitboard(board)
+    return X if bin(x).count("1") == bin(o).count("1") else O
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    action_set = set()
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] is EMPTY:
-                action_set.add((i, j))
-    return action_set
+    return {(i, j)
+            for i, row in enumerate(board)
+            for j, cell in enumerate(row)
+            if cell is EMPTY}
 
 
 def result(board, action):
@@ -51,115 +98,67 @@ def result(board, action):
     if board[action[0]][action[1]] is not EMPTY:
         raise IOError("Requested Action is Invalid")
 
-    board_copy = copy.deepcopy(board)
+    board_copy = [row[:] for row in board]
     board_copy[action[0]][action[1]] = player(board)
 
     return board_copy
 
-def winner(board):
+def winner(board, k=None):
     """
     Returns the winner of the game, if there is one.
     """
-    # Find out which player just moved (and is thus a candidate for winning the game)
-    current_player = X if player(board) is O else O
-
-    # Just using a dictionary for sake of readability
-    score_dict = {"row": 0, "column": 0, "diagonal": 0, "lanogaid": 0}
-
-    for i in range(3):
-        if board[i][i] is current_player:
-            score_dict["diagonal"] += 1
-        if board[i][2-i] is current_player:
-            score_dict["lanogaid"] += 1
-        score_dict["row"] = 0
-        score_dict["column"] = 0
-        for j in range(3):
-            if board[i][j] is current_player:
-                score_dict["row"] += 1
-            if board[j][i] is current_player:
-                score_dict["column"] += 1
-        # not very efficient sadly
-        if 3 in score_dict.values():
-            return current_player
+    game = game_for(board, k)
+    x, o = to_bitboard(board)
+    if game.won(x):
+        return X
+    if game.won(o):
+        return O
     return None
 
-def terminal(board):
+def terminal(board, k=None):
     """
     Returns True if game is over, False otherwise.
     """
-    return bool(winner(board) is not None or is_full(board))
+    return game_for(board, k).score(*to_bitboard(board)) is not None
 
 
-def utility(board):
+def utility(board, k=None):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) is X:
-        return 1
-    if winner(board) is O:
-        return -1
-    return 0
+    return game_for(board, k).score(*to_bitboard(board)) or 0
 
 
-def minimax(board):
+def minimax(board, k=None, time_limit=None, max_depth=None,
+            stop=None, progress=None):
     """
     Returns the optimal action for the current player on the board.
-    """
-    # In case provided state is terminal
-    if terminal(board):
+
+    With a time_limit (in seconds) or max_depth (in plies) the search
+    deepens iteratively and returns the best action found within them,
+    which is what makes boards bigger than 3x3 playable. Setting stop
+    (a threading.Event) ends the search early with the best action so
+    far, and progress(depth, action, value) is called after each depth.
+
+    Once load_book has been called, 3x3 boards are answered from the book.
+    """
+    game = game_for(board, k)
+    if opening_book is not None and (game.rows, game.cols, game.k) == (3, 3, 3):
+        entry = book.lookup(opening_book, *to_bitboard(board))
+        if entry is None:
+            return None
+        return divmod(entry[0], 3)
+
+    report = None
+    if progress is not None:
+        def report(depth, move, value):
+            progress(depth, to_action(board, move), value)
+
+    move = game.best_move(*to_bitboard(board), time_limit, max_depth,
+                          stop, report)
+    if move is None:
         return None
-    # determine current player and iterate over each action availible to them
-    current_player = player(board)
-    if current_player is X:
-        current_action_val = float('-inf')
-        beta = float('inf')
-        for action in actions(board):
-            candidate_val = min_value(result(board, action), current_action_val, beta)
-            if candidate_val > current_action_val:
-                current_action = action
-                current_action_val = candidate_val
-    else:
-        current_action_val = float('inf')
-        alpha = float('-inf')
-        for action in actions(board):
-            candidate_val = max_value(result(board, action), alpha, current_action_val)
-            if candidate_val < current_action_val:
-                current_action = action
-                current_action_val = candidate_val
-
-    return current_action
-
-
-def max_value(state, alpha, beta):
-    """
-    Returns maximum value of given state
-    """
-    val = float('-inf')
-    if terminal(state):
-        return utility(state)
-
-    for action in actions(state):
-        val = max(val, min_value(result(state, action), alpha, beta))
-        alpha = max(alpha, val)
-        if val >= beta:
-            return val
-    return val
-
-
-def min_value(state, alpha, beta):
-    """
-    Returns minimum value of given state
-    """
-    val = float('inf')
-    if terminal(state):
-        return utility(state)
-
-    for action in actions(state):
-        val = min(val, max_value(result(state, action), alpha, beta))
-        beta = min(beta, val)
-        if val <= alpha:
-            return val
-    return val
+    return to_action(board, move)
 
 
 def is_full(board):
@@ -0,0 +1,61 @@
+"""
+Background AI move computation for the Tic Tac Toe runner
+"""
+import threading
+import time
+
+import tictactoe as ttt
+
+
+class MoveWorker():
+    """
+    Searches for the AI's move on a background thread, so the caller's
+    event loop keeps running while it thinks.
+
+    The search deepens iteratively: best holds the best action found so
+    far and depth how deep that search went, until done is True and
+    action holds the final choice. cancel() abandons the search and
+    finish() asks it to settle for the best action so far.
+    """
+
+    def __init__(self, board, k=None, time_limit=None):
+        self.board = board
+        self.k = k
+        self.time_limit = time_limit
+        self.best = None
+        self.depth = 0
+        self.action = None
+        self.done = False
+        self.started = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def finish(self):
+        """Stops searching deeper, keeping the best action so far."""
+        self._stop.set()
+
+    def cancel(self):
+        """Stops the search and waits for the thread to exit."""
+        self._stop.set()
+        self._thread.join()
+
+    def _progress(self, depth, action, value):
+        with self._lock:
+            self.depth = depth
+            self.best = action
+
+    def _run(self):
+        action = ttt.minimax(self.board, self.k, self.time_limit,
+                             stop=self._stop, progress=self._progress)
+        with self._lock:
+            self.action = action
+            self.done = True
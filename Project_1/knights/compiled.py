@@ -0,0 +1,146 @@
+"""
+Compiled truth table engine for propositional logic
+
+A sentence is compiled once into Python closures over integer bitsets
+instead of being walked as a tree of Sentence objects in every model.
+Bit m of a bitset stands for the model numbered m within a block of
+models, where symbol i is true if bit i of m is set, so one pass of
+&, | and ^ over whole bitsets evaluates a sentence in every model of the
+block at once.
+"""
+from functools import lru_cache
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Symbols enumerated inside a single block of bitsets; the block holds
+# 2^BLOCK_BITS models, so each bitset takes 2^BLOCK_BITS / 8 bytes
+BLOCK_BITS = 18
+
+
+def compile_sentence(sentence, index):
+    """
+    Returns a function taking the bitsets of every symbol, in the order
+    given by index (a dictionary from symbol name to position), and the
+    bitset of every model in the block, and returning the bitset of the
+    models in which sentence is true.
+    """
+    if isinstance(sentence, Symbol):
+        position = index[sentence.name]
+        return lambda columns, ones: columns[position]
+
+    if isinstance(sentence, Not):
+        operand = compile_sentence(sentence.operand, index)
+        return lambda columns, ones: operand(columns, ones) ^ ones
+
+    if isinstance(sentence, And):
+        conjuncts = [compile_sentence(conjunct, index)
+                     for conjunct in sentence.conjuncts]
+
+        def conjunction(columns, ones):
+            value = ones
+            for conjunct in conjuncts:
+                value &= conjunct(columns, ones)
+                if not value:
+                    break
+            return value
+        return conjunction
+
+    if isinstance(sentence, Or):
+        disjuncts = [compile_sentence(disjunct, index)
+                     for disjunct in sentence.disjuncts]
+
+        def disjunction(columns, ones):
+            value = 0
+            for disjunct in disjuncts:
+                value |= disjunct(columns, ones)
+                if value == ones:
+                    break
+            return value
+        return disjunction
+
+    if isinstance(sentence, Implication):
+        antecedent = compile_sentence(sentence.antecedent, index)
+        consequent = compile_sentence(sentence.consequent, index)
+        return lambda columns, ones: (
+            (antecedent(columns, ones) ^ ones) | consequent(columns, ones))
+
+    if isinstance(sentence, Biconditional):
+        left = compile_sentence(sentence.left, index)
+        right = compile_sentence(sentence.right, index)
+        return lambda columns, ones: (
+            left(columns, ones) ^ right(columns, ones) ^ ones)
+
+    raise TypeError(f"can't compile {sentence!r}")
+
+
+@lru_cache(maxsize=None)
+def block_columns(bits):
+    """
+    Returns the bitset of every model in a block of 2^bits models and
+    the bitsets of the block's first bits symbols.
+    """
+    size = 1 << bits
+    ones = (1 << size) - 1
+    columns = []
+    for i in range(bits):
+        half = 1 << i
+        # 2^i models with symbol i false, then 2^i with it true, repeated
+        # across the block by multiplying with 1 every 2^(i + 1) bits
+        unit = ((1 << half) - 1) << half
+        columns.append(unit * (ones // ((1 << 2 * half) - 1)))
+    return ones, tuple(columns)
+
+
+def blocks(symbols, block_bits=BLOCK_BITS, fixed=()):
+    """
+    Yields (columns, ones) for every block of models over symbols: the
+    first block_bits symbols vary inside each block and the remaining
+    ones are fixed per block. fixed gives the values of further symbols,
+    whose columns follow those of symbols and are the same in every block.
+    """
+    low = min(len(symbols), block_bits)
+    ones, columns = block_columns(low)
+    high = len(symbols) - low
+    constant = [ones if value else 0 for value in fixed]
+    for assignment in range(1 << high):
+        varying = [ones if assignment >> i & 1 else 0 for i in range(high)]
+        yield list(columns) + varying + constant, ones
+
+
+def entails(knowledge, queries, model_blocks):
+    """
+    Returns a list saying, for each compiled query, if compiled knowledge
+    entails it in every model of model_blocks, an iterable of
+    (columns, ones).
+    """
+    entailed = [True] * len(queries)
+    for columns, ones in model_blocks:
+        models = knowledge(columns, ones)
+        if not models:
+            continue
+        # A model where the knowledge holds and a query doesn't
+        # is a counterexample to that query
+        for i, query in enumerate(queries):
+            if entailed[i] and models & ~query(columns, ones):
+                entailed[i] = False
+        if not any(entailed):
+            break
+    return entailed
+
+
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
+    return model_check_all(knowledge, [query])[0]
+
+
+def model_check_all(knowledge, queries):
+    """
+    Checks, for each query, if knowledge base entails it, evaluating
+    the knowledge only once per block. Returns a list of the answers.
+    """
+    symbols = sorted(set.union(knowledge.symbols(),
+                               *[query.symbols() for query in queries]))
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    return entails(compile_sentence(knowledge, index),
+                   [compile_sentence(query, index) for query in queries],
+                   blocks(symbols))
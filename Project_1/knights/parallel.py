@@ -0,0 +1,79 @@
+"""
+Parallel truth table engine for propositional logic
+
+The models are split into 2^k parts by fixing the values of the first k
+symbols, and the parts are checked with the compiled engine across a pool
+of worker processes. The first counterexample any worker finds stops the
+whole pool.
+"""
+import math
+import multiprocessing
+
+import compiled
+
+# With fewer symbols than this the truth table is checked in this process,
+# as it takes less time than starting a pool
+SERIAL_SYMBOLS = 20
+
+# Parts per worker process, so that parts finishing early even out
+PARTS_PER_PROCESS = 4
+
+# (knowledge, queries, symbols left to enumerate, symbols fixed per part),
+# set in each worker process by _start_worker
+_worker = None
+
+
+def model_check(knowledge, query, processes=None, split=None):
+    """
+    Checks if knowledge base entails query, using processes worker
+    processes (by default one per core) and fixing split symbols per part
+    (by default enough for PARTS_PER_PROCESS parts per process).
+    """
+    return model_check_all(knowledge, [query], processes, split)[0]
+
+
+def model_check_all(knowledge, queries, processes=None, split=None):
+    """
+    Checks, for each query, if knowledge base entails it, like
+    model_check. Returns a list of the answers.
+    """
+    symbols = sorted(set.union(knowledge.symbols(),
+                               *[query.symbols() for query in queries]))
+    processes = processes or multiprocessing.cpu_count()
+    if split is None:
+        if len(symbols) < SERIAL_SYMBOLS:
+            return compiled.model_check_all(knowledge, queries)
+        split = math.ceil(math.log2(processes * PARTS_PER_PROCESS))
+    split = min(split, len(symbols))
+
+    entailed = [True] * len(queries)
+    initargs = (knowledge, queries, symbols, split)
+    with multiprocessing.Pool(processes, _start_worker, initargs) as pool:
+        for part in pool.imap_unordered(_check_part, range(1 << split)):
+            entailed = [a and b for a, b in zip(entailed, part)]
+            if not any(entailed):
+                # Leaving the with block terminates the other workers
+                break
+    return entailed
+
+
+def _start_worker(knowledge, queries, symbols, split):
+    global _worker
+    # Columns of the enumerated symbols come first, then the fixed ones
+    rest, fixed = symbols[split:], symbols[:split]
+    index = {symbol: i for i, symbol in enumerate(rest + fixed)}
+    _worker = (compiled.compile_sentence(knowledge, index),
+               [compiled.compile_sentence(query, index) for query in queries],
+               rest, split)
+
+
+def _check_part(assignment):
+    """
+    Returns a list saying, for each query, if the knowledge entails it in
+    every model where bit i of assignment gives the value of the i-th
+    fixed symbol.
+    """
+    knowledge, queries, rest, split = _worker
+    fixed = [bool(assignment >> i & 1) for i in range(split)]
+    return compiled.entails(knowledge, queries,
+                            compiled.blocks(rest, fixed=fixed))
@@ -1,5 +1,21 @@
+import argparse
+import functools
+
+import compiled
+import parallel
+import sat
+import simplify
 from logic import *
 
+# Entailment engines selectable with --engine, each checking a list
+# of queries against one knowledge base
+ENGINES = {
+    "enumerate": model_check_all,
+    "compiled": compiled.model_check_all,
+    "parallel": parallel.model_check_all,
+    "sat": sat.model_check_all,
+}
+
 AKnight = Symbol("A is a Knight")
 AKnave = Symbol("A is a Knave")
 
@@ -83,6 +99,17 @@ knowledge3 = And(
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Solve knights and knaves puzzles.")
+    parser.add_argument("--engine", choices=ENGINES, default="enumerate",
+                        help="how to check entailment")
+    parser.add_argument("--simplify", action="store_true",
+                        help="simplify each knowledge base before checking")
+    args = parser.parse_args()
+    check = ENGINES[args.engine]
+    if args.simplify:
+        check = functools.partial(simplify.model_check_all, check_all=check)
+
     symbols = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
     puzzles = [
         ("Puzzle 0", knowledge0),
@@ -95,8 +122,8 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            for symbol, entailed in zip(symbols, check(knowledge, symbols)):
+                if entailed:
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,424 @@
+"""
+Satisfiability engine for propositional logic
+
+Knowledge entails a query exactly when knowledge ∧ ¬query has no model,
+so instead of enumerating every model the sentence is converted to
+conjunctive normal form with the Tseitin transform and handed to a
+conflict driven clause learning (CDCL) solver.
+
+Variables are numbered from 1 and a literal is a variable or its negation,
+as in the DIMACS format: 3 means variable 3 is true and -3 that it is false.
+"""
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Activities are scaled down together once one grows past this
+ACTIVITY_LIMIT = 1e100
+
+# Each conflict makes later bumps worth this many times more, so
+# variables involved in recent conflicts are decided first
+ACTIVITY_GROWTH = 1 / 0.95
+
+# Conflicts before the first restart, and how much longer each
+# later run is allowed to go
+RESTART_FIRST = 100
+RESTART_GROWTH = 1.5
+
+
+class Solver():
+    """
+    CDCL solver over clauses of integer literals.
+
+    Clauses are watched by two of their literals, so only the clauses
+    watching a literal are visited when it becomes false. Every conflict
+    is analysed back to its first unique implication point and the
+    resulting clause is learned, which also decides how far to backjump.
+    Learned clauses are kept across calls to solve, so asking several
+    questions of the same clauses gets cheaper as it goes.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.learnts = []
+        # Clauses watching each literal, visited when it becomes false
+        self.watches = {}
+
+        # Per variable state, indexed by variable (0 is unused)
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+
+        # Literals made true, in order, and where each decision level starts
+        self.trail = []
+        self.trail_limits = []
+        # Trail position up to which assignments have been propagated
+        self.head = 0
+
+        self.increment = 1.0
+        # False once the clauses are known to be unsatisfiable
+        self.ok = True
+
+        self.decisions = 0
+        self.propagations = 0
+        self.conflicts = 0
+
+    def new_variable(self):
+        """
+        Returns a new variable.
+        """
+        self.values.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        variable = len(self.values) - 1
+        self.watches[variable] = []
+        self.watches[-variable] = []
+        return variable
+
+    def value(self, literal):
+        """
+        Returns True or False if literal is assigned, otherwise None.
+        """
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, literals):
+        """
+        Adds the disjunction of literals to the clauses, returning False
+        if the clauses have become unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+
+        clause = []
+        for literal in literals:
+            value = self.value(literal)
+            # Already satisfied, or a tautology
+            if value is True or -literal in clause:
+                return True
+            # Literals known to be false can never help satisfy it
+            if value is None and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.watch(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        assumptions true, in which case model() returns a satisfying
+        assignment, and False if they aren't.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+
+        restart_limit = RESTART_FIRST
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_limits:
+                    self.ok = False
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.watch(learnt)
+                    self.learnts.append(learnt)
+                    self.assign(learnt[0], learnt)
+                self.increment *= ACTIVITY_GROWTH
+                continue
+
+            if conflicts >= restart_limit:
+                conflicts = 0
+                restart_limit = int(restart_limit * RESTART_GROWTH)
+                self.backtrack(0)
+                continue
+
+            # Assumptions are decided first, one per decision level
+            literal = None
+            while len(self.trail_limits) < len(assumptions):
+                assumption = assumptions[len(self.trail_limits)]
+                value = self.value(assumption)
+                if value is False:
+                    return False
+                if value is None:
+                    literal = assumption
+                    break
+                # Already true, so its level is left empty
+                self.trail_limits.append(len(self.trail))
+
+            if literal is None:
+                variable = self.pick()
+                if variable is None:
+                    return True
+                literal = variable if self.phases[variable] else -variable
+            self.decisions += 1
+            self.trail_limits.append(len(self.trail))
+            self.assign(literal, None)
+
+    def model(self):
+        """
+        Returns the assignment found by the last successful solve, as a
+        list indexed by variable.
+        """
+        return list(self.values)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by a clause with one unassigned
+        literal left, returning a clause made false if there is one and
+        None otherwise.
+
+        The watched literals of a clause are kept in its first two
+        positions, and a literal implied by a clause is its first.
+        """
+        value = self.value
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+
+            watching = self.watches[false]
+            kept = []
+            conflict = None
+            for i, clause in enumerate(watching):
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if value(first) is True:
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal that isn't false, if there is one
+                for j in range(2, len(clause)):
+                    if value(clause[j]) is not False:
+                        clause[1], clause[j] = clause[j], clause[1]
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value(first) is False:
+                        conflict = clause
+                        kept.extend(watching[i + 1:])
+                        break
+                    self.assign(first, clause)
+
+            self.watches[false] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns a clause learned from a conflict, asserting its first
+        literal, and the decision level to backjump to.
+
+        Literals assigned at the current level are resolved away, latest
+        first, until only one is left: the first unique implication point.
+        """
+        level = len(self.trail_limits)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen:
+                    continue
+                if not self.levels[variable]:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learnt.append(other)
+
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            clause = self.reasons[abs(literal)]
+            pending -= 1
+            if not pending:
+                break
+        learnt[0] = -literal
+
+        # Backjump to the latest level among the other literals, which
+        # are watched from the second position
+        if len(learnt) == 1:
+            return learnt, 0
+        deepest = max(range(1, len(learnt)),
+                      key=lambda i: self.levels[abs(learnt[i])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > ACTIVITY_LIMIT:
+            self.activity = [activity / ACTIVITY_LIMIT
+                             for activity in self.activity]
+            self.increment /= ACTIVITY_LIMIT
+
+    def pick(self):
+        """
+        Returns the unassigned variable with the highest activity,
+        or None if every variable is assigned.
+        """
+        best, best_activity = None, -1.0
+        values, activity = self.values, self.activity
+        for variable in range(1, len(values)):
+            if values[variable] is None and activity[variable] > best_activity:
+                best, best_activity = variable, activity[variable]
+        return best
+
+    def backtrack(self, level):
+        """
+        Undoes every assignment made above decision level.
+        """
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            # Remember the value, to try again when next deciding it
+            self.phases[variable] = literal > 0
+            self.values[variable] = None
+            self.reasons[variable] = None
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.head = min(self.head, start)
+
+
+class Encoder():
+    """
+    Tseitin transform of sentences into a Solver's clauses.
+
+    Every compound sentence gets a variable of its own, constrained to be
+    equivalent to the sentence, so the clauses grow linearly with the
+    sentence instead of exponentially. Sentences seen before reuse their
+    variable.
+    """
+
+    def __init__(self, solver=None):
+        self.solver = solver if solver is not None else Solver()
+        # Variable of each symbol, by name
+        self.variables = {}
+        # Literal equivalent to each sentence encoded so far
+        self.literals = {}
+
+    def add(self, sentence):
+        """
+        Adds sentence to the solver's clauses as a fact.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        else:
+            self.solver.add_clause([self.encode(sentence)])
+
+    def encode(self, sentence):
+        """
+        Returns a literal that is true exactly when sentence is.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.solver.new_variable()
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.encode(sentence.operand)
+
+        literal = self.literals.get(sentence)
+        if literal is not None:
+            return literal
+        add_clause = self.solver.add_clause
+
+        if isinstance(sentence, (And, Or, Implication)):
+            if isinstance(sentence, And):
+                children = [self.encode(conjunct)
+                            for conjunct in sentence.conjuncts]
+            elif isinstance(sentence, Or):
+                children = [self.encode(disjunct)
+                            for disjunct in sentence.disjuncts]
+            else:
+                children = [-self.encode(sentence.antecedent),
+                            self.encode(sentence.consequent)]
+            literal = self.solver.new_variable()
+            if isinstance(sentence, And):
+                # literal => each child, and all children => literal
+                for child in children:
+                    add_clause([-literal, child])
+                add_clause([literal] + [-child for child in children])
+            else:
+                # literal => some child, and each child => literal
+                add_clause([-literal] + children)
+                for child in children:
+                    add_clause([literal, -child])
+
+        elif isinstance(sentence, Biconditional):
+            left = self.encode(sentence.left)
+            right = self.encode(sentence.right)
+            literal = self.solver.new_variable()
+            add_clause([-literal, -left, right])
+            add_clause([-literal, left, -right])
+            add_clause([literal, left, right])
+            add_clause([literal, -left, -right])
+
+        else:
+            raise TypeError(f"can't encode {sentence!r}")
+
+        self.literals[sentence] = literal
+        return literal
+
+
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
+    encoder = Encoder()
+    encoder.add(knowledge)
+    encoder.add(Not(query))
+    return not encoder.solver.solve()
+
+
+def model_check_all(knowledge, queries):
+    """
+    Checks, for each query, if knowledge base entails it. The knowledge
+    is encoded once and each query is assumed false in turn, so clauses
+    learned answering one query speed up the next. Returns a list of the
+    answers.
+    """
+    encoder = Encoder()
+    encoder.add(knowledge)
+    solver = encoder.solver
+    return [not solver.solve([-encoder.encode(query)]) for query in queries]
@@ -0,0 +1,225 @@
+"""
+Knowledge base simplification for propositional logic
+
+Sentences are rewritten into smaller equivalent ones: nested conjunctions
+and disjunctions are flattened, constants folded away, duplicate children
+dropped and symbols whose values are known substituted. Conjuncts of the
+knowledge that are a bare symbol or its negation make those values known,
+and are propagated through the rest of the knowledge until nothing new
+is learned.
+
+There are no constant sentences in logic, so the empty conjunction And()
+stands for true and the empty disjunction Or() for false.
+"""
+import itertools
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+TRUE = And()
+FALSE = Or()
+
+
+def simplify(sentence, known=None, cache=None):
+    """
+    Returns a sentence equivalent to sentence when each symbol in known,
+    a dictionary from symbol name to value, has that value. Sub-sentences
+    are simplified once each and remembered in cache.
+    """
+    known = known if known is not None else {}
+    cache = cache if cache is not None else {}
+    if sentence in cache:
+        return cache[sentence]
+
+    if isinstance(sentence, Symbol):
+        if sentence.name in known:
+            result = TRUE if known[sentence.name] else FALSE
+        else:
+            result = sentence
+
+    elif isinstance(sentence, Not):
+        result = negate(simplify(sentence.operand, known, cache))
+
+    elif isinstance(sentence, And):
+        result = _junction(And, TRUE, FALSE, [
+            simplify(conjunct, known, cache)
+            for conjunct in sentence.conjuncts
+        ])
+
+    elif isinstance(sentence, Or):
+        result = _junction(Or, FALSE, TRUE, [
+            simplify(disjunct, known, cache)
+            for disjunct in sentence.disjuncts
+        ])
+
+    elif isinstance(sentence, Implication):
+        antecedent = simplify(sentence.antecedent, known, cache)
+        consequent = simplify(sentence.consequent, known, cache)
+        if (antecedent is FALSE or consequent is TRUE
+                or antecedent is consequent):
+            result = TRUE
+        elif antecedent is TRUE:
+            result = consequent
+        elif consequent is FALSE:
+            result = negate(antecedent)
+        else:
+            result = Implication(antecedent, consequent)
+
+    elif isinstance(sentence, Biconditional):
+        left = simplify(sentence.left, known, cache)
+        right = simplify(sentence.right, known, cache)
+        if left is right:
+            result = TRUE
+        elif left is negate(right):
+            result = FALSE
+        elif left is TRUE or left is FALSE:
+            result = right if left is TRUE else negate(right)
+        elif right is TRUE or right is FALSE:
+            result = left if right is TRUE else negate(left)
+        else:
+            result = Biconditional(left, right)
+
+    else:
+        raise TypeError(f"can't simplify {sentence!r}")
+
+    cache[sentence] = result
+    return result
+
+
+def negate(sentence):
+    """
+    Returns the negation of a simplified sentence, without stacking
+    negations or negating constants.
+    """
+    if sentence is TRUE:
+        return FALSE
+    if sentence is FALSE:
+        return TRUE
+    if isinstance(sentence, Not):
+        return sentence.operand
+    return Not(sentence)
+
+
+def _junction(kind, identity, absorbing, children):
+    """
+    Returns the And or Or (as kind) of simplified children, flattening
+    nested ones of the same kind and dropping duplicates and identity.
+    """
+    flat = {}
+    for child in children:
+        for grandchild in (_children(child) if isinstance(child, kind)
+                           else (child,)):
+            if grandchild is identity:
+                continue
+            # x and ¬x together decide the whole sentence
+            if grandchild is absorbing or negate(grandchild) in flat:
+                return absorbing
+            flat[grandchild] = None
+    if not flat:
+        return identity
+    if len(flat) == 1:
+        return next(iter(flat))
+    return kind(*flat)
+
+
+def _children(sentence):
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    return sentence.disjuncts
+
+
+def propagate(knowledge):
+    """
+    Simplifies knowledge using the values of symbols it asserts directly.
+
+    Returns the simplified rest of the knowledge and the dictionary of
+    known symbol values, which together are equivalent to knowledge.
+    """
+    known = {}
+    while True:
+        knowledge = simplify(knowledge, known)
+        units = {}
+        for conjunct in (knowledge.conjuncts if isinstance(knowledge, And)
+                         else (knowledge,)):
+            if isinstance(conjunct, Symbol):
+                units[conjunct.name] = True
+            elif (isinstance(conjunct, Not)
+                    and isinstance(conjunct.operand, Symbol)):
+                units[conjunct.operand.name] = False
+        if not units:
+            return knowledge, known
+        known.update(units)
+
+
+def evaluate(sentence, model, cache=None):
+    """
+    Evaluates sentence in model like Sentence.evaluate, but evaluates
+    each distinct sub-sentence only once, remembering its value in cache.
+    """
+    cache = cache if cache is not None else {}
+    if sentence in cache:
+        return cache[sentence]
+
+    if isinstance(sentence, Symbol):
+        value = sentence.evaluate(model)
+    elif isinstance(sentence, Not):
+        value = not evaluate(sentence.operand, model, cache)
+    elif isinstance(sentence, And):
+        value = all(evaluate(conjunct, model, cache)
+                    for conjunct in sentence.conjuncts)
+    elif isinstance(sentence, Or):
+        value = any(evaluate(disjunct, model, cache)
+                    for disjunct in sentence.disjuncts)
+    elif isinstance(sentence, Implication):
+        value = (not evaluate(sentence.antecedent, model, cache)
+                 or evaluate(sentence.consequent, model, cache))
+    elif isinstance(sentence, Biconditional):
+        value = (evaluate(sentence.left, model, cache)
+                 == evaluate(sentence.right, model, cache))
+    else:
+        value = sentence.evaluate(model)
+
+    cache[sentence] = value
+    return value
+
+
+def enumerate_all(knowledge, queries):
+    """
+    Checks, for each query, if knowledge base entails it by enumerating
+    every model, with sub-sentences shared between the knowledge and the
+    queries evaluated once per model. Returns a list of the answers.
+    """
+    symbols = sorted(set.union(knowledge.symbols(),
+                               *[query.symbols() for query in queries]))
+    entailed = [True] * len(queries)
+    for values in itertools.product((True, False), repeat=len(symbols)):
+        model = dict(zip(symbols, values))
+        cache = {}
+        if not evaluate(knowledge, model, cache):
+            continue
+        for i, query in enumerate(queries):
+            if entailed[i] and not evaluate(query, model, cache):
+                entailed[i] = False
+    return entailed
+
+
+def model_check(knowledge, query, check_all=enumerate_all):
+    """Checks if knowledge base entails query, simplifying both first."""
+    return model_check_all(knowledge, [query], check_all)[0]
+
+
+def model_check_all(knowledge, queries, check_all=enumerate_all):
+    """
+    Checks, for each query, if knowledge base entails it. The knowledge
+    and queries are simplified first, and queries that aren't settled by
+    that are passed to check_all, a function like logic.model_check_all.
+    Returns a list of the answers.
+    """
+    knowledge, known = propagate(knowledge)
+    if knowledge is FALSE:
+        return [True] * len(queries)
+
+    cache = {}
+    queries = [simplify(query, known, cache) for query in queries]
+    open_queries = [query for query in queries if query is not TRUE]
+    answers = iter(check_all(knowledge, open_queries) if open_queries else ())
+    return [True if query is TRUE else next(answers) for query in queries]
@@ -1,5 +1,23 @@
 import itertools
+import math
 import random
+from collections import deque
+
+
+# Frontier components whose enumeration takes more search nodes than this
+# are estimated from their sentences instead
+MAX_SEARCH_NODES = 200000
+
+# The enumeration recurses once per cell, so frontier components with more
+# cells than this are estimated too, well clear of the recursion limit
+MAX_COMPONENT_CELLS = 400
+
+
+class SearchLimitExceeded(Exception):
+    """
+    Raised when enumerating the mines of a frontier component
+    takes too long, or the component is too big to enumerate.
+    """
 
 
 class Minesweeper():
@@ -89,6 +107,10 @@ class Sentence():
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    Sentences are hashed by their cells and count, so one held in a set
+    or dictionary has to be taken out before it is marked and put back
+    after.
     """
 
     def __init__(self, cells, count):
@@ -98,6 +120,9 @@ class Sentence():
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
+    def __hash__(self):
+        return hash((frozenset(self.cells), self.count))
+
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
@@ -140,11 +165,13 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mine_count=None):
 
-        # Set initial height and width
+        # Set initial height and width, and the number of mines on the
+        # board if it is known
         self.height = height
         self.width = width
+        self.mine_count = mine_count
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -153,8 +180,21 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Set of sentences about the game known to be true. Marking a
+        # cell takes every sentence holding it out, marks it and puts
+        # it back
+        self.knowledge = set()
+
+        # Maps each cell to the sentences in the knowledge holding it
+        self.cell_sentences = {}
+
+        # Sentences added since inference last ran, still to be checked
+        # for known cells and against the sentences they overlap
+        self.pending = deque()
+
+        # Enumerated mine placements of frontier components, by their
+        # sentences, kept while the component stays the same
+        self.component_cache = {}
 
     def mark_mine(self, cell):
         """
@@ -162,8 +202,11 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        # Taken out of the knowledge while it changes, as it is hashed
+        for sentence in self.cell_sentences.pop(cell, set()):
+            self.remove_sentence(sentence)
             sentence.mark_mine(cell)
+            self.add_sentence(sentence)
 
     def mark_safe(self, cell):
         """
@@ -171,8 +214,34 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        for sentence in self.cell_sentences.pop(cell, set()):
+            self.remove_sentence(sentence)
             sentence.mark_safe(cell)
+            self.add_sentence(sentence)
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge, unless it is empty or already
+        known, and queues it for inference.
+        """
+        if not sentence.cells or sentence in self.knowledge:
+            return
+        self.knowledge.add(sentence)
+        for cell in sentence.cells:
+            self.cell_sentences.setdefault(cell, set()).add(sentence)
+        self.pending.append(sentence)
+
+    def remove_sentence(self, sentence):
+        """
+        Removes a sentence from the knowledge and the cell index.
+        """
+        self.knowledge.discard(sentence)
+        for cell in sentence.cells:
+            sentences = self.cell_sentences.get(cell)
+            if sentences is not None:
+                sentences.discard(sentence)
+                if not sentences:
+                    del self.cell_sentences[cell]
 
     def add_knowledge(self, cell, count):
         """
@@ -197,62 +266,48 @@ class MinesweeperAI():
 
         # 3
         new_neighbours, new_count = self.get_neighbours(cell, count)
-        if new_neighbours:
-            self.knowledge.append(Sentence(new_neighbours, new_count))
-
-        # 4 & 5, will continously loop until neither mark_cells or -
-        # add_new_sentences make changes to the knowledge base
-        while self.mark_cells() or self.add_new_sentences():
-            print("No. Sentences = ", len(self.knowledge))
-
+        self.add_sentence(Sentence(new_neighbours, new_count))
 
-    def clean_up(self):
-        """
-        Removes Empty Sentences
-        """
-        for sentence in self.knowledge:
-            if not sentence.cells:
-                self.knowledge.remove(sentence)
+        # 4 & 5, only sentences changed or added since the last move
+        # need checking, so this is proportional to the local change
+        self.infer()
 
-    def mark_cells(self):
-        """
-        Marks any additional cells as safe or mines if it may be concluded from the AIs database
+    def infer(self):
         """
-        new_safes = set()
-        new_mines = set()
-
-        for sentence in self.knowledge:
-            safe_store = sentence.known_safes()
-            mine_store = sentence.known_mines()
-            if safe_store is not None:
-                new_safes = new_safes | safe_store
-            if mine_store is not None:
-                new_mines = new_mines | mine_store
-
-        for the_safe in new_safes:
-            self.mark_safe(the_safe)
-        for the_mine in new_mines:
-            self.mark_mine(the_mine)
+        Works through the queue of new sentences until it is empty: marks
+        the cells of sentences whose cells are all mines or all safe, and
+        adds the difference between each sentence and any sentence whose
+        cells are a subset or superset of its own.
 
-        self.clean_up()
-        return new_safes or new_mines
-
-    def add_new_sentences(self):
-        """
-        Infers New Sentences from the knowledge base and adds them
+        Every sentence added or changed along the way joins the queue, so
+        when it is empty nothing more can be concluded.
         """
-        new_knowledge = []
-        for set1, set2 in itertools.permutations(self.knowledge, 2):
-            if set1.cells < set2.cells:
-                # Makes sure knowledge isn't already in self.knowledge,
-                # avoids infinite re-adding of same sentence edge-case
-                if Sentence(set2.cells - set1.cells, set2.count - set1.count) not in self.knowledge:
-                    print("_____________________")
-                    print("ADDING NEW KNOWLEDGE")
-                    print("_____________________")
-                    new_knowledge.append(Sentence(set2.cells - set1.cells, set2.count - set1.count))
-        self.knowledge.extend(new_knowledge)
-        return bool(new_knowledge)
+        while self.pending:
+            sentence = self.pending.popleft()
+            # Replaced after a cell in it was marked
+            if sentence not in self.knowledge:
+                continue
+
+            if sentence.known_mines() is not None:
+                for cell in list(sentence.cells):
+                    self.mark_mine(cell)
+                continue
+            if sentence.known_safes() is not None:
+                for cell in list(sentence.cells):
+                    self.mark_safe(cell)
+                continue
+
+            # Only sentences sharing a cell can be subsets or supersets
+            overlapping = set()
+            for cell in sentence.cells:
+                overlapping |= self.cell_sentences.get(cell, set())
+            for other in overlapping:
+                if other.cells < sentence.cells:
+                    self.add_sentence(Sentence(sentence.cells - other.cells,
+                                               sentence.count - other.count))
+                elif sentence.cells < other.cells:
+                    self.add_sentence(Sentence(other.cells - sentence.cells,
+                                               other.count - sentence.count))
 
     def get_neighbours(self, cell, count):
         """
@@ -297,13 +352,226 @@ class MinesweeperAI():
 
     def make_random_move(self):
         """
-        Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
-            1) have not already been chosen, and
-            2) are not known to be mines
+        Returns a move to make on the Minesweeper board when no cell is
+        known to be safe: the cell least likely to be a mine (see
+        mine_probabilities) among cells that have not already been
+        chosen and are not known to be mines, picking randomly between
+        equally likely ones.
+        Returns None if there is no such cell.
         """
         print("Making Random Move")
-        universe = set(itertools.product(range(self.height), range(self.width)))
-        valid_moves = universe - self.moves_made - self.mines
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+
+        # Choose the cell least likely to be a mine
+        lowest = min(probabilities.values())
+        best = [cell for cell, probability in probabilities.items()
+                if probability <= lowest + 1e-9]
+        return random.choice(sorted(best))
 
-        return random.choice(list(valid_moves)) if valid_moves else None
+    def mine_probabilities(self):
+        """
+        Returns a dictionary from every cell not yet chosen nor known to
+        be a mine to the probability that it is a mine.
+
+        Every placement of mines in a frontier component that agrees with
+        the knowledge is counted, grouped by how many mines it uses. If
+        the number of mines on the board is known, the placements are
+        weighted by the number of ways to place the remaining mines in
+        the cells no sentence mentions.
+        """
+        universe = set(itertools.product(range(self.height),
+                                         range(self.width)))
+        unknown = universe - self.moves_made - self.mines
+        probabilities = {cell: 0.0 for cell in unknown & self.safes}
+
+        exact = []
+        estimated = {}
+        cache = {}
+        for cells, sentences in self.components():
+            # By value, as sentences change when their cells are marked
+            key = frozenset((frozenset(sentence.cells), sentence.count)
+                            for sentence in sentences)
+            placements = self.component_cache.get(key)
+            if placements is None:
+                try:
+                    placements = self.enumerate_component(cells, sentences)
+                except SearchLimitExceeded:
+                    placements = False
+            cache[key] = placements
+            if placements and placements[0]:
+                exact.append(placements)
+            else:
+                # Too many placements to count, so take each cell's
+                # average share of the mines of its sentences
+                for cell in cells:
+                    shares = [sentence.count / len(sentence.cells)
+                              for sentence in self.cell_sentences[cell]]
+                    estimated[cell] = sum(shares) / len(shares)
+        self.component_cache = cache
+        probabilities.update(estimated)
+
+        unconstrained = unknown - self.safes - set(self.cell_sentences)
+        if self.mine_count is not None:
+            remaining = (self.mine_count - len(self.mines)
+                         - round(sum(estimated.values())))
+            if self.weigh_placements(exact, unconstrained, remaining,
+                                     probabilities):
+                return probabilities
+
+        # Without a usable mine count every placement counts the same,
+        # and cells no sentence mentions are as likely as the frontier
+        for ways, cell_ways in exact:
+            total = sum(ways.values())
+            for cell, by_mines in cell_ways.items():
+                probabilities[cell] = sum(by_mines.values()) / total
+        frontier = [probabilities[cell] for cell in self.cell_sentences]
+        rest = sum(frontier) / len(frontier) if frontier else 0.5
+        for cell in unconstrained:
+            probabilities[cell] = rest
+        return probabilities
+
+    def weigh_placements(self, exact, unconstrained, remaining,
+                         probabilities):
+        """
+        Fills in probabilities for the cells of the exactly enumerated
+        components and for the unconstrained cells, given that remaining
+        mines are left to place between them.
+
+        Returns False if no placement uses a possible number of mines.
+        """
+        def rest_ways(mines):
+            # Ways to put the mines left over in the unconstrained cells
+            left = remaining - mines
+            if 0 <= left <= len(unconstrained):
+                return math.comb(len(unconstrained), left)
+            return 0
+
+        total = convolve([ways for ways, _ in exact])
+        weight = sum(count * rest_ways(mines)
+                     for mines, count in total.items())
+        if not weight:
+            return False
+
+        for i, (ways, cell_ways) in enumerate(exact):
+            others = convolve([other for j, (other, _) in enumerate(exact)
+                               if j != i])
+            for cell, by_mines in cell_ways.items():
+                probabilities[cell] = sum(
+                    count * other_count * rest_ways(mines + other_mines)
+                    for mines, count in by_mines.items()
+                    for other_mines, other_count in others.items()
+                ) / weight
+
+        if unconstrained:
+            expected = sum(count * rest_ways(mines) * (remaining - mines)
+                           for mines, count in total.items())
+            for cell in unconstrained:
+                probabilities[cell] = expected / weight / len(unconstrained)
+        return True
+
+    def components(self):
+        """
+        Returns the frontier, every unknown cell some sentence mentions,
+        split into independent components: a list of (cells, sentences)
+        where no sentence mentions cells of two components.
+        """
+        seen = set()
+        found = []
+        for start in self.cell_sentences:
+            if start in seen:
+                continue
+            seen.add(start)
+            cells = [start]
+            sentences = set()
+            # Breadth first, so cells near each other stay near in the list
+            i = 0
+            while i < len(cells):
+                for sentence in self.cell_sentences[cells[i]]:
+                    if sentence in sentences:
+                        continue
+                    sentences.add(sentence)
+                    for cell in sentence.cells:
+                        if cell not in seen:
+                            seen.add(cell)
+                            cells.append(cell)
+                i += 1
+            found.append((cells, list(sentences)))
+        return found
+
+    def enumerate_component(self, cells, sentences):
+        """
+        Counts every placement of mines in cells that agrees with
+        sentences, by backtracking over cells in order and abandoning a
+        branch as soon as a sentence can no longer be satisfied.
+
+        Returns (ways, cell_ways): ways maps a number of mines to how many
+        placements use that many, and cell_ways maps each cell to the same
+        count for just the placements with a mine in that cell. Raises
+        SearchLimitExceeded after MAX_SEARCH_NODES search nodes, or at
+        once if there are more than MAX_COMPONENT_CELLS cells.
+        """
+        if len(cells) > MAX_COMPONENT_CELLS:
+            raise SearchLimitExceeded()
+        holding = {cell: [i for i, sentence in enumerate(sentences)
+                          if cell in sentence.cells]
+                   for cell in cells}
+        # Mines still to place and cells still to decide, per sentence
+        mines_left = [sentence.count for sentence in sentences]
+        cells_left = [len(sentence.cells) for sentence in sentences]
+
+        ways = {}
+        cell_ways = {cell: {} for cell in cells}
+        placed = []
+        nodes = 0
+
+        def search(position):
+            nonlocal nodes
+            nodes += 1
+            if nodes > MAX_SEARCH_NODES:
+                raise SearchLimitExceeded()
+            if position == len(cells):
+                mines = len(placed)
+                ways[mines] = ways.get(mines, 0) + 1
+                for cell in placed:
+                    cell_ways[cell][mines] = cell_ways[cell].get(mines, 0) + 1
+                return
+
+            cell = cells[position]
+            for mine in (False, True):
+                consistent = True
+                for i in holding[cell]:
+                    cells_left[i] -= 1
+                    mines_left[i] -= mine
+                    if not 0 <= mines_left[i] <= cells_left[i]:
+                        consistent = False
+                if consistent:
+                    if mine:
+                        placed.append(cell)
+                    search(position + 1)
+                    if mine:
+                        placed.pop()
+                for i in holding[cell]:
+                    cells_left[i] += 1
+                    mines_left[i] += mine
+
+        search(0)
+        return ways, cell_ways
+
+
+def convolve(distributions):
+    """
+    Returns the distribution of the total number of mines over several
+    independent components, given for each a dictionary from a number of
+    mines to how many placements use that many.
+    """
+    total = {0: 1}
+    for distribution in distributions:
+        combined = {}
+        for mines, count in total.items():
+            for more, ways in distribution.items():
+                combined[mines + more] = (combined.get(mines + more, 0)
+                                          + count * ways)
+        total = combined
+    return total